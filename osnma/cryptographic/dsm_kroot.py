@@ -53,6 +53,21 @@ class DSMKroot(DSM):
                 self.set_size('KROOT', KS_lt[uint_value])
                 self._compute_padding_size()
 
+    def _resolve_variable_sizes(self, read_header_field):
+        nb_dk = read_header_field('NB_DK')
+        self.size_blocks = NB_DK_lt[nb_dk]
+        self.size_bits = NB_DK_size_lt[nb_dk]
+
+        pkid = read_header_field('PKID')
+        self._pkr_verification(pkid)
+        self.public_key = self.pkr_dict[pkid].get_public_key()
+
+        kroot_size = KS_lt[read_header_field('KS')]
+        ds_size = self.pkr_dict[pkid].get_signature_len()
+        padding_size = self.size_bits - 104 - kroot_size - ds_size
+
+        return {'KROOT': kroot_size, 'DS': ds_size, 'P_DK': padding_size}
+
     def _compute_padding_size(self):
         padding_size = self.size_bits - 104 - self.get_size('KROOT') - self.get_size('DS')
         self.set_size('P_DK', padding_size)
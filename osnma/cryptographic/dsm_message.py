@@ -14,9 +14,9 @@
 # See the Licence for the specific language governing permissions and limitations under the Licence.
 #
 
-from typing import Dict
+from typing import Dict, Callable
 
-from functools import wraps
+from functools import wraps, lru_cache
 
 from bitstring import BitArray
 from ..structures.fields_information import Field, field_info
@@ -50,6 +50,27 @@ def to_bitarray(func):
     return wrapper_to_bitarray
 
 
+@lru_cache(maxsize=None)
+def compile_dsm_layout(structure: tuple[str, ...], variable_sizes: tuple[tuple[str, int], ...] = ()) \
+        -> dict[str, tuple[int, int]]:
+    """Computes the (start, end) bit position of each field of a DSM structure. The fields not present in
+    `variable_sizes` take the size from `field_info`. The layouts are cached, so the DSMs of the same type and sizes
+    share them.
+
+    :param structure: Ordered field names of the DSM.
+    :param variable_sizes: Pairs of field name and size for the fields whose size depends on the DSM content.
+    :return: Dictionary with the field name and its (start, end) bit positions.
+    """
+    sizes = dict(variable_sizes)
+    layout = {}
+    start = 0
+    for name in structure:
+        end = start + sizes.get(name, field_info[name]['size'])
+        layout[name] = (start, end)
+        start = end
+    return layout
+
+
 class DSM:
 
     def __init__(self):
@@ -59,22 +80,28 @@ class DSM:
         self.verified = False
         self.fields: Dict[str, Field] = {}
 
-        for name, field in field_info.items(): # TODO: Search for alternative only load necessary fields
-            self.fields[name] = Field(field['name'], None, field['size'])
+    def _get_or_create_field(self, name) -> Field:
+        field = self.fields.get(name)
+        if field is None:
+            field = Field(name, None, field_info[name]['size'])
+            self.fields[name] = field
+        return field
 
     @to_bitarray
     def set_value(self, name, value):
-        self.fields[name].value = value
+        self._get_or_create_field(name).value = value
         self._extra_actions(name)
 
-    def get_value(self, name) -> BitArray:
-        return self.fields[name].value
+    def get_value(self, name) -> BitArray | None:
+        field = self.fields.get(name)
+        return None if field is None else field.value
 
     def set_size(self, name, size):
-        self.fields[name].size = size
+        self._get_or_create_field(name).size = size
 
     def get_size(self, name):
-        return self.fields[name].size
+        field = self.fields.get(name)
+        return field_info[name]['size'] if field is None else field.size
 
     @to_bitarray
     def set_field(self, field):
@@ -90,9 +117,26 @@ class DSM:
     def _extra_actions(self, name):
         pass
 
+    def _resolve_variable_sizes(self, read_header_field: Callable[[str], int]) -> dict[str, int]:
+        """Reads the header fields that define the size of the variable fields of the DSM and returns these sizes.
+
+        :param read_header_field: Function that returns the value of a fixed size field of the DSM as integer.
+        :return: Dictionary with the name and size of each variable field.
+        """
+        return {}
+
     @to_bitarray
     def process_structure_data(self, structure, data_stream):
-        bit_counter = 0
-        for field in structure:
-            self.set_value(field, data_stream[bit_counter:bit_counter + self.get_size(field)])
-            bit_counter += self.get_size(field)
+        structure = tuple(structure)
+        stream_int = data_stream.uint
+        stream_size = len(data_stream)
+        header_layout = compile_dsm_layout(structure)
+
+        def read_header_field(name: str) -> int:
+            start, end = header_layout[name]
+            return (stream_int >> (stream_size - end)) & ((1 << (end - start)) - 1)
+
+        variable_sizes = self._resolve_variable_sizes(read_header_field)
+        layout = compile_dsm_layout(structure, tuple(variable_sizes.items()))
+        for name, (start, end) in layout.items():
+            self.fields[name] = Field(name, data_stream[start:end], end - start)
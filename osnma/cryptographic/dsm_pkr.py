@@ -54,6 +54,17 @@ class DSMPKR(DSM):
                     padding_size = self.size_bits - 1040 - self.get_size('NPK')
                     self.set_size('P_DP', padding_size)
 
+    def _resolve_variable_sizes(self, read_header_field):
+        nb_dp = read_header_field('NB_DP')
+        self.size_blocks = NB_DP_lt[nb_dp]
+        self.size_bits = NB_DP_size_lt[nb_dp]
+
+        self._set_key_params(read_header_field('NPKT'))
+        npk_size = self.get_size('NPK')
+        padding_size = self.size_bits - 1040 - npk_size
+
+        return {'NPK': npk_size, 'P_DP': padding_size}
+
     @to_bitarray
     def set_merkle_root(self, merkle_root):
         self.merkle_root = merkle_root
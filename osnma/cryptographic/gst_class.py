@@ -161,6 +161,10 @@ class GST:
     def int(self):
         return self.wn << LEN_TOW | self.tow
 
+    @property
+    def bytes(self):
+        return self.int.to_bytes(LEN_GST // 8, 'big')
+
     @property
     def total_seconds(self):
         return (self.wn * (MAX_TOW+1)) + self.tow
@@ -14,11 +14,6 @@
 # See the Licence for the specific language governing permissions and limitations under the Licence.
 #
 
-######## type annotations ########
-from typing import TYPE_CHECKING
-if TYPE_CHECKING:
-    from osnma.osnma_core.tesla_chain import TESLAChain
-
 ######## imports ########
 from ..structures.mack_structures import MACKMessage, Tag0AndSeq, TagAndInfo, TESLAKey
 from ..structures.fields_information import field_info
@@ -43,17 +38,19 @@ MACK_PAGE_SIZE = 32
 
 class MACKMessageParser:
     """
-    Updated version. Now there is only 1 MACK block per MACK message.
+    Updated version. Now there is only 1 MACK block per MACK message. The parser only depends on the chain ID and the
+    key and tag sizes of the chain, so MACK messages can be parsed before the TESLA chain is created.
     """
 
-    def __init__(self, tesla_chain: 'TESLAChain'):
-        self.tesla_chain = tesla_chain
-        self.chain_id = self.tesla_chain.chain_id
-        self.key_size = self.tesla_chain.key_size
-        self.tag_size = self.tesla_chain.tag_size
+    def __init__(self, chain_id: int, key_size: int, tag_size: int):
+        self.chain_id = chain_id
+        self.key_size = key_size
+        self.tag_size = tag_size
         self.num_tags = (MACK_MSG_SIZE - self.key_size) // (self.tag_size + TAG_INFO_SIZE)
         self.full_tag_size = self.tag_size + TAG_INFO_SIZE
         self.tesla_key_gst_start_offset = ((self.full_tag_size * self.num_tags) // MACK_PAGE_SIZE)*2+1
+        self.key_pages_slice, self.key_bit_slice = self._get_pages_and_slice(self.full_tag_size * self.num_tags,
+                                                                             self.key_size)
         self.nma_status = None
 
         self.gst_sf_reconstructed_tesla = GST()
@@ -74,22 +71,22 @@ class MACKMessageParser:
         return slice(page_start, page_end+1), slice(page_bit_start, page_bit_end)
 
     def parse_mack_header(self, tag0_seq_msg, gst_sf, prn_a) -> Tag0AndSeq:
-        tag0 = tag0_seq_msg[:self.tag_size]
-        mac_seq = tag0_seq_msg[self.tag_size:self.tag_size + MACSEQ_SIZE]
-        iod_tag = tag0_seq_msg[-IOD_TAG_SIZE:]
-        tag0_seq = Tag0AndSeq(tag0, prn_a, iod_tag, gst_sf, mac_seq, self.nma_status)
+        tag0 = tag0_seq_msg[:self.tag_size].uint
+        mac_seq = tag0_seq_msg[self.tag_size:self.tag_size + MACSEQ_SIZE].uint
+        iod_tag = tag0_seq_msg[-IOD_TAG_SIZE:].uint
+        tag0_seq = Tag0AndSeq(tag0, self.tag_size, prn_a, iod_tag, gst_sf, mac_seq, self.nma_status)
 
         return tag0_seq
 
     def parse_complete_tag(self, complete_tag_message, gst_sf, prn_a, counter) -> TagAndInfo:
 
-        tag = complete_tag_message[:self.tag_size]
+        tag = complete_tag_message[:self.tag_size].uint
         info = complete_tag_message[self.tag_size:]
-        prn_d = info[:PRN_D_SIZE]
-        adkd = info[PRN_D_SIZE:PRN_D_SIZE + ADKD_SIZE]
-        iod_tag = info[-IOD_TAG_SIZE:]
+        prn_d = info[:PRN_D_SIZE].uint
+        adkd = info[PRN_D_SIZE:PRN_D_SIZE + ADKD_SIZE].uint
+        iod_tag = info[-IOD_TAG_SIZE:].uint
 
-        tag_and_info = TagAndInfo(tag, prn_d, adkd, iod_tag, gst_sf, prn_a, counter + 1, self.nma_status)
+        tag_and_info = TagAndInfo(tag, self.tag_size, prn_d, adkd, iod_tag, gst_sf, prn_a, counter + 1, self.nma_status)
 
         return tag_and_info
 
@@ -103,11 +100,21 @@ class MACKMessageParser:
             key_pages_bits.append(key_page)
         return key_pages_bits, missing_key_pages
 
+    def parse_tesla_key(self, mack_message: list[BitArray | None], gst_sf: GST, prn_a: int) -> TESLAKey | None:
+        """
+        Parses only the TESLA key of a MACK message, if all its pages have been received. The state of the TESLA key
+        reconstruction is not used nor modified.
+        """
+        key_pages_bits, missing_key_pages = self.extract_from_mack_message(mack_message[self.key_pages_slice])
+        if missing_key_pages:
+            return None
+        tesla_key_gst_page_start = gst_sf + self.tesla_key_gst_start_offset
+        return TESLAKey(gst_sf, key_pages_bits[self.key_bit_slice], prn_a, gst_start=tesla_key_gst_page_start)
+
     def parse_mack_message(self, mack_message: list[BitArray], gst_sf: GST, prn_a: int,
                            nma_status: BitArray) -> MACKMessage:
 
-        self.nma_status = nma_status
-        prn_a = BitArray(uint=prn_a, length=8)
+        self.nma_status = nma_status.uint
 
         mack_msg_parsed = MACKMessage(gst_sf, self.chain_id, prn_a, self.num_tags)
 
@@ -131,7 +138,7 @@ class MACKMessageParser:
 
         # TESLA KEY
         reconstructed = False
-        key_pages_slice, key_bit_slice = self._get_pages_and_slice(self.full_tag_size * self.num_tags, self.key_size)
+        key_pages_slice, key_bit_slice = self.key_pages_slice, self.key_bit_slice
 
         key_pages_bits, missing_key_pages = self.extract_from_mack_message(mack_message[key_pages_slice])
         if missing_key_pages and Config.DO_TESLA_KEY_REGEN:
@@ -153,7 +160,7 @@ class MACKMessageParser:
         if not missing_key_pages:
             tesla_key_bits = key_pages_bits[key_bit_slice]
             tesla_key_gst_page_start = gst_sf + self.tesla_key_gst_start_offset
-            tesla_key = TESLAKey(gst_sf, tesla_key_bits, prn_a.uint, gst_start=tesla_key_gst_page_start, reconstructed=reconstructed)
+            tesla_key = TESLAKey(gst_sf, tesla_key_bits, prn_a, gst_start=tesla_key_gst_page_start, reconstructed=reconstructed)
             mack_msg_parsed.add_key(tesla_key)
 
         return mack_msg_parsed
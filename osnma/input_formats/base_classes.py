@@ -16,7 +16,8 @@
 
 from enum import Enum
 from bitstring import BitArray
-from osnma.cryptographic.gst_class import GST
+from osnma.cryptographic.gst_class import GST, SECONDS_PER_WEEK
+from typing import Iterable
 
 class GAL_BAND(str, Enum):
     E1B = 'E1-B'
@@ -70,6 +71,61 @@ class DataFormat:
         self.bid = hkroot[4:]
 
 
+class PageBatch:
+    """
+    Columnar batch of I/NAV pages in reception order. Each attribute is a list with one entry per page and the 240 bits
+    of each page are stored as an integer, so the batch can be filtered without building a DataFormat for every page.
+    """
+
+    def __init__(self, svid: list[int], wn: list[int], tow: list[int], nav_bits: 'list[BitArray | bytes | int]',
+                 band: list[GAL_BAND] = None, crc: list[bool] = None, independent_clock: 'list[GST | None]' = None):
+
+        self.svid = list(svid)
+        self.wn = list(wn)
+        self.tow = list(tow)
+        self.nav_bits = [self._bits_to_int(bits) for bits in nav_bits]
+        self.band = list(band) if band is not None else [GAL_BAND.E1B] * len(self.svid)
+        self.crc = list(crc) if crc is not None else [True] * len(self.svid)
+        self.independent_clock = list(independent_clock) if independent_clock is not None else [None] * len(self.svid)
+        "GST of the independent clock when each page was received, if the input provides it"
+
+        columns = (self.svid, self.wn, self.tow, self.nav_bits, self.band, self.crc, self.independent_clock)
+        if any(len(column) != len(self.svid) for column in columns):
+            raise ValueError(f"All the columns of the PageBatch must have the same length.")
+
+        self.gst_seconds = [wn * SECONDS_PER_WEEK + tow for wn, tow in zip(self.wn, self.tow)]
+        "GST of each page in seconds, used to compare times without GST objects"
+
+    @staticmethod
+    def _bits_to_int(nav_bits: 'BitArray | bytes | int') -> int:
+        if isinstance(nav_bits, int):
+            value, length = nav_bits, 240 if nav_bits >> 240 == 0 else nav_bits.bit_length()
+        elif isinstance(nav_bits, bytes):
+            value, length = int.from_bytes(nav_bits, 'big'), len(nav_bits) * 8
+        else:
+            value, length = nav_bits.uint, len(nav_bits)
+        if length != 240:
+            raise ValueError(f"The PageBatch object accepts nominal pages (or double pages) with 240 bits."
+                             f" Current length {length} bits.")
+        return value
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[DataFormat]) -> 'PageBatch':
+        pages = list(pages)
+        return cls([page.svid for page in pages], [page.gst_page.wn for page in pages],
+                   [page.gst_page.tow for page in pages], [page.nav_bits for page in pages],
+                   [page.band for page in pages], [page.crc for page in pages],
+                   [page.independent_clock for page in pages])
+
+    def __len__(self) -> int:
+        return len(self.svid)
+
+    def get_page(self, index: int) -> DataFormat:
+        return DataFormat(self.svid[index], self.wn[index], self.tow[index],
+                          BitArray(uint=self.nav_bits[index], length=240), self.band[index], self.crc[index],
+                          self.independent_clock[index])
+
+
 class PageIterator:
     """
     Abstract class to be implemented by any input format
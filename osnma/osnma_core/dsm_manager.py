@@ -18,7 +18,8 @@
 from enum import Enum, IntEnum
 from bitstring import BitArray
 
-from osnma.structures.fields_information import NB_DK_lt, NB_DP_lt
+from osnma.structures.fields_information import NB_DK_lt, NB_DP_lt, section_structure
+from osnma.cryptographic.dsm_message import compile_dsm_layout
 
 ######## logger ########
 import osnma.utils.logger_factory as log_factory
@@ -63,6 +64,17 @@ class DigitalSignatureMessage:
                     f"({len(self.blocks_received)}/{'?' if self.total_of_blocks is None else self.total_of_blocks}): "
                     f"{sorted(self.blocks_received.keys())}\n")
 
+    def get_kroot_header_field(self, name: str) -> int | None:
+        """
+        Reads a field of the DSM-KROOT header, before the KROOT, from the first block. Returns None if the first block
+        has not been received.
+        """
+        first_block = self.blocks_received.get(0)
+        if first_block is None:
+            return None
+        start, end = compile_dsm_layout(tuple(section_structure['DSM_KROOT']))[name]
+        return first_block[start:end].uint
+
     def is_complete(self) -> bool:
         return len(self.blocks_received) == self.total_of_blocks
 
@@ -14,9 +14,12 @@
 # See the Licence for the specific language governing permissions and limitations under the Licence.
 #
 
+from typing import Callable
+
 ######## imports ########
 from osnma.receiver.satellite import GAL_BAND, DataFormat
-from osnma.structures.adkd import adkd_masks
+from osnma.structures.adkd import (adkd_masks, adkd_word_layout, get_word_from_page, get_word_type, get_word_iod,
+                                    get_adkd_data_from_word, pack_bits, IOD_SIZE)
 from osnma.structures.mack_structures import TagAndInfo
 from osnma.cryptographic.gst_class import GST
 from osnma.utils.config import Config
@@ -25,6 +28,10 @@ from osnma.utils.exceptions import StoppedAtFAF, ReedSolomonRecoveryError
 from osnma.utils.reed_solomon_recovery import REED_SOLOMON_WORDS, ReedSolomonRecovery
 
 from bitstring import BitArray
+import hashlib
+from operator import attrgetter
+from collections import deque
+from bisect import bisect_left
 
 ######## logger ########
 import osnma.utils.logger_factory as log_factory
@@ -39,28 +46,39 @@ WORDS_PER_ADKD = {0: [1, 2, 3, 4, 5],
                   12: [1, 2, 3, 4, 5],
                   4: [6, 10]}
 
+DIGEST_SIZE = 16
+
+
+def get_data_digest(nav_data_stream: bytes) -> bytes:
+    """
+    Content digest of a navigation data stream, used to identify the data authenticated by the tags.
+    """
+    return hashlib.blake2b(nav_data_stream, digest_size=DIGEST_SIZE).digest()
+
 
 class AuthenticatedData:
 
+    __slots__ = ('acc_length', 'start_gst', 'last_gst', 'iod', 'log_message', 'prn_d', 'adkd', 'index')
+
     auth_message = 'AUTHENTICATED: ADKD {adkd:02} - Satellite {satellite:02} {iod} ' \
                    '\n\t\t GST SF {gst_start}  to  GST SF {gst_last} ' \
                    '\n\t\t {words} \n'
 
-    def __init__(self, tag: TagAndInfo):
-        self.acc_length = len(tag.tag_value)
+    def __init__(self, tag: TagAndInfo, index: int):
+        self.acc_length = tag.tag_size
         self.start_gst = tag.gst_subframe
         self.last_gst = self.start_gst
-        self.iod = tag.nav_data.iod if tag.adkd.uint != 4 else None
-        self.new_tags = True
-        self.log_message = self._generate_message(tag.adkd.uint, tag.prn_d.uint, self.iod)
-        self.prn_d = tag.prn_d.uint
-        self.adkd = tag.adkd.uint
+        self.iod = tag.nav_data.iod if tag.adkd != 4 else None
+        self.log_message = self._generate_message(tag.adkd, tag.prn_d, self.iod)
+        self.prn_d = tag.prn_d
+        self.adkd = tag.adkd
+        self.index = index
 
-    def _generate_message(self, adkd: int, prn_d: int, iod: BitArray) -> str:
+    def _generate_message(self, adkd: int, prn_d: int, iod: int | None) -> str:
         if iod is None:
             iod_message = ""
         else:
-            iod_message = f"- IOD {self.iod}"
+            iod_message = f"- IOD 0b{iod:0{IOD_SIZE}b}"
 
         words_message = "Words "
         for word in WORDS_PER_ADKD[adkd]:
@@ -73,9 +91,8 @@ class AuthenticatedData:
         return auth_message
 
     def add_tag(self, tag: TagAndInfo):
-        self.acc_length += len(tag.tag_value)
+        self.acc_length += tag.tag_size
         self.last_gst = tag.gst_subframe
-        self.new_tags = True
 
     def log_authenticated(self):
         gst_start = f"{self.start_gst}"
@@ -83,27 +100,24 @@ class AuthenticatedData:
         logger.info(self.log_message.format(gst_start=gst_start, gst_last=gst_last))
 
     def get_json(self) -> dict:
-        return {'iod': None if self.adkd == 4 else self.iod.bin, 'start_gst': [self.start_gst.wn, self.start_gst.tow],
+        return {'iod': None if self.adkd == 4 else f"{self.iod:0{IOD_SIZE}b}", 'start_gst': [self.start_gst.wn, self.start_gst.tow],
                 'last_gst': [self.last_gst.wn, self.last_gst.tow], 'acc_length': self.acc_length}
 
     def __repr__(self):
         return f"{{acc_length: {self.acc_length}, start_gst: {self.start_gst}, " \
-               f"last_gst: {self.last_gst}, iod: {self.iod}, new_tags: {self.new_tags}}}"
+               f"last_gst: {self.last_gst}, iod: {self.iod}}}"
 
 
 class ADKDDataManager:
-    ADKD_MASKS = adkd_masks
 
     def __init__(self, adkd: int, svid: int):
         self.adkd = adkd
         self.svid = svid
 
-    def _get_adkd_data_from_word(self, full_page: BitArray, word_type: int):
-        mask_start, mask_end  = self.ADKD_MASKS[self.adkd]['adkd'][word_type]['bits']
-        adkd_word_data = full_page[mask_start:mask_end]
-        return adkd_word_data
+    def _get_adkd_data_from_word(self, word: int, word_type: int) -> int:
+        return get_adkd_data_from_word(self.adkd, word_type, word)
 
-    def add_word(self, word_type: int, data: BitArray, gst_page: GST):
+    def add_word(self, word_type: int, word: int, gst_page: GST):
         pass
 
     def get_nav_data(self, tag: TagAndInfo):
@@ -111,12 +125,23 @@ class ADKDDataManager:
 
 
 class ADKD0DataBlock:
+    """
+    CED data of a satellite for one IOD. The words 1 to 5 are kept in fixed slots as integers, which are shared with
+    the next block when only the word type 5 changes. Once complete, the ADKD0 data stream is computed once as integer,
+    packed bytes and content digest, and shared by all the tags authenticating the block.
+    """
+
+    __slots__ = ('gst_start', 'iod', 'words', 'nav_data_value', 'nav_data_stream', 'nav_data_digest', 'nav_data_len',
+                 'last_gst_updated', 'gst_completed', 'last_cop', 'last_cop_gst')
 
-    def __init__(self, gst_start: GST):
+    def __init__(self, gst_start: GST, words: list[int | None] = None):
         self.gst_start = gst_start
-        self.iod: BitArray | None = None
-        self.words: dict[int, BitArray] = {}
-        self.nav_data_stream: BitArray | None = None
+        self.iod: int | None = None
+        self.words: list[int | None] = [None] * 5 if words is None else list(words)
+        self.nav_data_value: int | None = None
+        self.nav_data_stream: bytes | None = None
+        self.nav_data_digest: bytes | None = None
+        self.nav_data_len: int = adkd_masks[ADKD0]['len']
         self.last_gst_updated = gst_start
         self.gst_completed = GST()
         self.last_cop = 0
@@ -133,30 +158,41 @@ class ADKD0DataBlock:
 
         return msg
 
-    def add_word(self, word_type: int, data: BitArray, gst_page: GST):
+    def add_word(self, word_type: int, data: int, gst_page: GST):
         self.last_gst_updated = gst_page
         if word_type != 5:
-            self.iod = data[:10]
-        self.words[word_type] = data
-        if not self.gst_completed and len(self.words) == 5:
+            self.iod = data >> (adkd_word_layout[ADKD0][word_type][2] - IOD_SIZE)
+        self.words[word_type - 1] = data
+        if not self.gst_completed and None not in self.words:
             self.gst_completed = gst_page
             self._compute_data_stream()
 
-    def get_word(self, word_type: int) -> BitArray | None:
-        return self.words.get(word_type)
+    def get_word(self, word_type: int) -> int | None:
+        return self.words[word_type - 1]
 
     def _compute_data_stream(self):
-        data_stream = BitArray()
-        for i in range(1, 6):
-            data_stream.append(self.words[i])
-        self.nav_data_stream = data_stream
+        data_stream = 0
+        for word, (_, _, size) in zip(self.words, adkd_word_layout[ADKD0].values()):
+            data_stream = (data_stream << size) | word
+        self.set_data_stream(data_stream)
+
+    def set_data_stream(self, nav_data_value: int):
+        self.nav_data_value = nav_data_value
+        self.nav_data_stream = pack_bits(nav_data_value, self.nav_data_len)
+        self.nav_data_digest = get_data_digest(self.nav_data_stream)
 
 
 class ADKD0DataManager(ADKDDataManager):
 
-    def __init__(self, svid: int):
+    def __init__(self, svid: int, ced_callback: Callable[[int], None] | None = None):
+        """
+        :param ced_callback: Called with the SVID the first time the satellite has a full set of CED words.
+        """
         super().__init__(ADKD0, svid)
+        self.ced_callback = ced_callback
         self.adkd0_data_blocks: list[ADKD0DataBlock] = []
+        self.gst_starts: list[int] = []
+        """ GST start of each data block as integer, in the same order as the blocks for the bisect search """
         self.satellite_has_ced = False
 
     def __repr__(self):
@@ -172,7 +208,7 @@ class ADKD0DataManager(ADKDDataManager):
             return True
         return False
 
-    def _is_new_adkd0_data_block(self, iod: BitArray, gst_page: GST) -> bool:
+    def _is_new_adkd0_data_block(self, iod: int, gst_page: GST) -> bool:
         if len(self.adkd0_data_blocks) == 0:
             return True
         if self.adkd0_data_blocks[-1].iod != iod:
@@ -181,19 +217,25 @@ class ADKD0DataManager(ADKDDataManager):
             # The IOD may be the same after 4 hours of data due to rotation of nav messages
             return True
 
-    def _clean_old_data(self):
+    def _append_data_block(self, data_block: ADKD0DataBlock):
         """
-        If a data block has no gst_completed value and there is new data in the list, we can delete the old data because
-        it will never complete.
+        Appends a new data block and cleans the old data. If the previous data block has no gst_completed value it will
+        never complete, so it is deleted. Only the last data block can be incomplete.
         """
-        previous_block_not_complete = False
-        for idx, data_block in enumerate(list(self.adkd0_data_blocks)):
-            if previous_block_not_complete:
-                self.adkd0_data_blocks.pop(idx-1)
-            if not data_block.gst_completed:
-                previous_block_not_complete = True
-
-    def _handle_word_type_5(self, word_5_data: BitArray, gst_page: GST):
+        if self.adkd0_data_blocks and not self.adkd0_data_blocks[-1].gst_completed:
+            self.adkd0_data_blocks.pop()
+            self.gst_starts.pop()
+        self.adkd0_data_blocks.append(data_block)
+        self.gst_starts.append(data_block.gst_start.int)
+
+    def drop_old_data_blocks(self):
+        """
+        Deletes all the data blocks but the last one.
+        """
+        del self.adkd0_data_blocks[:-1]
+        del self.gst_starts[:-1]
+
+    def _handle_word_type_5(self, word_5_data: int, gst_page: GST):
         if len(self.adkd0_data_blocks) == 0:
             # Not initialized, cant link WT5
             return
@@ -212,62 +254,66 @@ class ADKD0DataManager(ADKDDataManager):
             # Update the old data to updated on the previous subframe
             # TODO: Due to a bug in DV bits, sometimes there is a change in WT5 not reflected in COP. Keep track of COP.
             last_adkd0_block.last_gst_updated = (gst_page - (gst_page % 30) - 1)
-            new_adkd0data_block = ADKD0DataBlock(gst_page)
+            new_adkd0data_block = ADKD0DataBlock(gst_page, last_adkd0_block.words)
             new_adkd0data_block.iod = last_adkd0_block.iod
-            new_adkd0data_block.words = dict(last_adkd0_block.words)
             new_adkd0data_block.add_word(5, word_5_data, gst_page)
-            self.adkd0_data_blocks.append(new_adkd0data_block)
+            self._append_data_block(new_adkd0data_block)
 
     def _check_ced(self):
-        if not self.satellite_has_ced:
-            self.satellite_has_ced = any([adkd_data for adkd_data in self.adkd0_data_blocks if adkd_data.gst_completed])
+        # A data block can only be completed while it is the last one
+        if not self.satellite_has_ced and self.adkd0_data_blocks:
+            self.satellite_has_ced = bool(self.adkd0_data_blocks[-1].gst_completed)
+            if self.satellite_has_ced and self.ced_callback is not None:
+                self.ced_callback(self.svid)
 
-    def add_word(self, word_type: int, page: BitArray, gst_page: GST):
+    def add_word(self, word_type: int, word: int, gst_page: GST):
 
         StatusLogger.log_nav_data(self.svid, self.adkd, word_type)
-        adkd_data = self._get_adkd_data_from_word(page, word_type)
+        adkd_data = self._get_adkd_data_from_word(word, word_type)
         if word_type != 5:
-            iod = adkd_data[:10]
+            iod = get_word_iod(word)
             StatusLogger.log_nav_data_iod(self.svid, iod)
             if self._is_new_adkd0_data_block(iod, gst_page):
                 new_adkd0 = ADKD0DataBlock(gst_page)
                 new_adkd0.add_word(word_type, adkd_data, gst_page)
-                self.adkd0_data_blocks.append(new_adkd0)
+                self._append_data_block(new_adkd0)
             else:
                 self.adkd0_data_blocks[-1].add_word(word_type, adkd_data, gst_page)
         else:
             self._handle_word_type_5(adkd_data, gst_page)
 
-        self._clean_old_data()
         self._check_ced()
 
     def get_nav_data(self, tag: TagAndInfo) -> ADKD0DataBlock | None:
+        """
+        Searches the data block received inside the COP range of the tag, [GST_SF - 30*COP, GST_SF), or the block still
+        updated at the start of the range when the COP is saturated. The blocks are ordered by GST start and do not
+        overlap, so only the last block starting before the range and the first block starting inside it can match.
+        """
         data = None
-        tag_data_gst_sf_limit = tag.gst_subframe-30*tag.cop.uint
-        gst_start_tesla_key = tag.tesla_key.gst_start
-
-        for nav_data in self.adkd0_data_blocks:
-            if not nav_data.gst_completed:
-                break  # TODO: continue?
-            if tag_data_gst_sf_limit <= nav_data.gst_start < tag.gst_subframe:
-                # Data received inside COP range, check TS and proceed
-                if nav_data.gst_completed >= gst_start_tesla_key - Config.TS:
-                    # Completed after TS, do not use. The leading edge of both key and the data is used.
-                    # [WT1][WT3][WT5]..|........[Tesla Key 128bits]
-                    # 29   27   25              0                   TS value to use previous subframe if possible
-                    data = None
-                    break
-                data = nav_data
-                break
-            elif nav_data.gst_start < tag_data_gst_sf_limit < nav_data.last_gst_updated:
-                # Case with COP saturated at 15 and data from the satellite still updated in COP limit
-                data = nav_data
-                break
+        gst_sf = tag.gst_subframe.int
+        tag_data_gst_sf_limit = tag.gst_subframe - 30*tag.cop
+        gst_sf_limit = tag_data_gst_sf_limit.int
+
+        index = bisect_left(self.gst_starts, gst_sf_limit)
+        if index > 0 and gst_sf_limit < self.adkd0_data_blocks[index-1].last_gst_updated.int:
+            # Case with COP saturated at 15 and data from the satellite still updated in COP limit
+            data = self.adkd0_data_blocks[index-1]
+        elif index < len(self.gst_starts) and self.gst_starts[index] < gst_sf:
+            # Data received inside COP range, check TS and proceed
+            data = self.adkd0_data_blocks[index]
+            if data.gst_completed and data.gst_completed >= tag.tesla_key.gst_start - Config.TS:
+                # Completed after TS, do not use. The leading edge of both key and the data is used.
+                # [WT1][WT3][WT5]..|........[Tesla Key 128bits]
+                # 29   27   25              0                   TS value to use previous subframe if possible
+                data = None
+        if data is not None and not data.gst_completed:
+            data = None
 
         if data is None and tag.prn_a != tag.prn_d and len(self.adkd0_data_blocks) >= 1:
             # Last check: cross-auth tag for a satellite we lost view but the data may still be valid
             last_data_block = self.adkd0_data_blocks[-1]
-            if (tag.cop.uint >= last_data_block.last_cop and last_data_block.gst_start < tag.gst_subframe
+            if (tag.cop >= last_data_block.last_cop and last_data_block.gst_start < tag.gst_subframe
                     and last_data_block.last_cop_gst > tag.gst_subframe - last_data_block.last_cop*30):
                 # Only if the COP is equal or higher (no reset in data) AND
                 # we are sure there's not enough time to get to the same COP with new data.
@@ -277,25 +323,38 @@ class ADKD0DataManager(ADKDDataManager):
 
     def update_gst_start_with_cop(self, tag: TagAndInfo):
         """
-        Checks if there's data for that COP. If there is, update the GST Start to the max value cop indicates.
+        Checks if there's data for that COP. If there is, update the GST Start to the max value cop indicates. The GST
+        Start is kept after the last update of the previous data block, so the blocks remain ordered and without
+        overlap for the bisect search.
         """
         if len(self.adkd0_data_blocks) > 0:
             last_data_block = self.adkd0_data_blocks[-1]
-            gst_cop_start = tag.gst_subframe - tag.cop.uint * 30
+            gst_cop_start = tag.gst_subframe - tag.cop * 30
+            if len(self.adkd0_data_blocks) > 1:
+                gst_cop_start = max(gst_cop_start, self.adkd0_data_blocks[-2].last_gst_updated + 1)
             if gst_cop_start < last_data_block.gst_start < tag.gst_subframe:
                 logger.debug(f"SVID {self.svid} Updated gst start from {last_data_block.gst_start} to {gst_cop_start}"
                              f" using{' FLX' if tag.is_flx else ''} {tag}. Data block: {last_data_block}")
                 last_data_block.gst_start = gst_cop_start
+                self.gst_starts[-1] = gst_cop_start.int
 
 
 class ADKD4DataBlock:
-    def __init__(self, gst_start: GST, nav_data_stream: BitArray):
+
+    __slots__ = ('gst_start', 'nav_data_value', 'nav_data_stream', 'nav_data_digest', 'nav_data_len')
+
+    def __init__(self, gst_start: GST, nav_data_value: int):
         self.gst_start = gst_start
-        self.nav_data_stream = nav_data_stream
+        self.nav_data_len: int = adkd_masks[ADKD4]['len']
+        self.nav_data_value = nav_data_value
+        self.nav_data_stream = pack_bits(nav_data_value, self.nav_data_len)
+        self.nav_data_digest = get_data_digest(self.nav_data_stream)
 
 class ADKD4SingleWord:
 
-    def __init__(self, gst_start: GST, data: BitArray):
+    __slots__ = ('gst_start', 'last_gst_updated', 'data')
+
+    def __init__(self, gst_start: GST, data: int):
         self.gst_start = gst_start
         self.last_gst_updated = gst_start
         self.data = data
@@ -312,15 +371,17 @@ class ADKD4DataManager(ADKDDataManager):
     def __init__(self, svid: int):
         super().__init__(ADKD4, svid)
         self.words_per_type: dict[int, list[ADKD4SingleWord]] = {6: [], 10: []}
+        self.data_blocks: dict[tuple[int, int], ADKD4DataBlock] = {}
+        """ Data blocks already built, by the pair of WT6 and WT10 data """
 
     def __repr__(self):
         return f"{self.words_per_type}"
 
-    def add_word(self, word_type: int, full_page: BitArray, gst_page: GST):
+    def add_word(self, word_type: int, word: int, gst_page: GST):
 
         StatusLogger.log_nav_data(self.svid, self.adkd, word_type)
 
-        new_adkd_data = self._get_adkd_data_from_word(full_page, word_type)
+        new_adkd_data = self._get_adkd_data_from_word(word, word_type)
         saved_words = self.words_per_type[word_type]
 
         if saved_words and new_adkd_data == saved_words[-1].data:
@@ -329,24 +390,35 @@ class ADKD4DataManager(ADKDDataManager):
             saved_words.append(ADKD4SingleWord(gst_page, new_adkd_data))
             if len(saved_words) > 2:
                 # Arbitrary number, since these WT change very slowly having 2 of each in memory is enough
-                saved_words.pop(0)
+                old_data = saved_words.pop(0).data
+                position = 0 if word_type == 6 else 1
+                self.data_blocks = {words: block for words, block in self.data_blocks.items()
+                                    if words[position] != old_data}
 
     def get_nav_data(self, tag: TagAndInfo):
 
-        nav_data = {6: False, 10: False}
-        tag_data_gst_sf_limit = tag.gst_subframe-30*tag.cop.uint
+        nav_data = {6: None, 10: None}
+        gst_sf = tag.gst_subframe.int
+        gst_sf_limit = (tag.gst_subframe - 30*tag.cop).int
 
-        # Search for the newest word6 and word10 when the tag was received
+        # Search for the newest word6 and word10 when the tag was received. At most two words per type are kept.
         for word_type, word_list in self.words_per_type.items():
             for word in word_list:
-                if tag_data_gst_sf_limit <= word.gst_start < tag.gst_subframe:
-                    nav_data[word_type] = BitArray(word.data)
-                elif word.gst_start < tag_data_gst_sf_limit < word.last_gst_updated:
-                    nav_data[word_type] = BitArray(word.data)
+                word_gst_start = word.gst_start.int
+                if gst_sf_limit <= word_gst_start < gst_sf:
+                    nav_data[word_type] = word.data
+                elif word_gst_start < gst_sf_limit < word.last_gst_updated.int:
+                    nav_data[word_type] = word.data
                     break
 
-        if nav_data[6] and nav_data[10]:
-            return ADKD4DataBlock(tag.gst_subframe, nav_data[6] + nav_data[10])
+        if nav_data[6] is not None and nav_data[10] is not None:
+            # The block is shared by all the tags of the same data, the GST start is the one of the first tag
+            words = (nav_data[6], nav_data[10])
+            if (data_block := self.data_blocks.get(words)) is None:
+                word_10_size = adkd_word_layout[ADKD4][10][2]
+                data_block = ADKD4DataBlock(tag.gst_subframe, (nav_data[6] << word_10_size) | nav_data[10])
+                self.data_blocks[words] = data_block
+            return data_block
         else:
             return None
 
@@ -367,12 +439,21 @@ class NavigationDataManager:
         self.ttfaf: int | None= None
         self.sats_with_ced: set[int] = set()
         self.ttff: int | None = None
-        self.authenticated_data_dict: dict[tuple[int, int, BitArray], AuthenticatedData] = {}
+        self.authenticated_data_dict: dict[tuple[int, int, bytes], AuthenticatedData] = {}
+        """ Authenticated data by ADKD, PRN_D and content digest of the data """
+        self.new_authenticated_data: dict[tuple[int, int, bytes], AuthenticatedData] = {}
+        """ Authenticated data with new tags since the last check, the only data that can reach the tag length """
+        self.authenticated_data_count = 0
+        self.latest_authenticated_data: dict[tuple[int, int], AuthenticatedData] = {}
+        """ Authenticated data with the newest tag by ADKD and PRN_D """
+        self.authenticated_data_ids: dict[tuple[int, int], deque[tuple[int, int, bytes]]] = {}
+        """ Keys of the authenticated data retained by ADKD and PRN_D, in creation order """
+        self.dummy_data_blocks: dict[int, ADKD0DataBlock | ADKD4DataBlock] = {}
 
         self.adkd0_data_managers: dict[int, ADKD0DataManager] = {}
         self.adkd4_data_managers: dict[int, ADKD4DataManager] = {}
         for i in range(1, Config.NS+1):
-            self.adkd0_data_managers[i] = ADKD0DataManager(i)
+            self.adkd0_data_managers[i] = ADKD0DataManager(i, self.sats_with_ced.add)
             self.adkd4_data_managers[i] = ADKD4DataManager(i)
 
         self.active_words = set()
@@ -388,27 +469,34 @@ class NavigationDataManager:
         """
         For dummy tags, the navigation data has to a zero array of the ADKD size.
         """
-        adkd = tag.adkd.uint
-        nav_data_len = adkd_masks[adkd]['len']
+        adkd = tag.adkd
+        if nav_data := self.dummy_data_blocks.get(adkd):
+            return nav_data
+
         if adkd == 4:
-            nav_data = ADKD4DataBlock(GST(), BitArray(nav_data_len))
+            nav_data = ADKD4DataBlock(GST(), 0)
+            self.dummy_data_blocks[adkd] = nav_data
         elif adkd == 0 or adkd == 12:
             nav_data = ADKD0DataBlock(GST())
-            nav_data.nav_data_stream = BitArray(nav_data_len)
+            nav_data.set_data_stream(0)
+            self.dummy_data_blocks[adkd] = nav_data
         else:
             logger.warning(f"Dummy tag {tag} for a not implemented ADKD")
             nav_data = None
 
         return nav_data
 
-    def _get_word_type_and_data(self, full_page: BitArray):
-        word_type = full_page[2:8].uint
-        word_data = full_page[2:114] + full_page[122:138]
-        return word_type, word_data
+    def _get_word_type_and_data(self, full_page: BitArray) -> tuple[int, int]:
+        """
+        Returns the word type and the 128 bits word of the page as integer, so the ADKD data can be extracted with the
+        precomputed masks without slicing BitArrays.
+        """
+        word_data = get_word_from_page(full_page.uint)
+        return get_word_type(word_data), word_data
 
     def get_data(self, tag: TagAndInfo):
-        svid = tag.prn_d.uint
-        adkd = tag.adkd.uint
+        svid = tag.prn_d
+        adkd = tag.adkd
         nav_data = None
 
         if tag.is_dummy:
@@ -426,10 +514,35 @@ class NavigationDataManager:
         return nav_data
 
     def new_tag_verified(self, tag: TagAndInfo):
-        if tag.data_id in self.authenticated_data_dict:
-            self.authenticated_data_dict[tag.data_id].add_tag(tag)
+        auth_data = self.authenticated_data_dict.get(tag.data_id)
+        if auth_data is not None:
+            auth_data.add_tag(tag)
         else:
-            self.authenticated_data_dict[tag.data_id] = AuthenticatedData(tag)
+            auth_data = AuthenticatedData(tag, self.authenticated_data_count)
+            self.authenticated_data_dict[tag.data_id] = auth_data
+            self.authenticated_data_count += 1
+            self._retain_authenticated_data(tag.data_id, tag.gst_subframe)
+        self.new_authenticated_data[tag.data_id] = auth_data
+
+        latest_key = (auth_data.adkd, auth_data.prn_d)
+        latest_auth_data = self.latest_authenticated_data.get(latest_key)
+        if latest_auth_data is None or latest_auth_data.last_gst < auth_data.last_gst:
+            self.latest_authenticated_data[latest_key] = auth_data
+
+    def _retain_authenticated_data(self, data_id: tuple[int, int, bytes], gst_sf: GST):
+        """
+        Keeps at least the last Config.AUTHENTICATED_DATA_PER_SATELLITE data blocks authenticated for the ADKD and PRN_D
+        of the new data block. Older blocks are removed from the oldest only once they can no longer receive tags, when
+        their last tag is more than Config.AUTHENTICATED_DATA_TAG_WINDOW seconds older than the new block.
+        """
+        adkd, prn_d, _ = data_id
+        data_ids = self.authenticated_data_ids.setdefault((adkd, prn_d), deque())
+        data_ids.append(data_id)
+        gst_limit = gst_sf - Config.AUTHENTICATED_DATA_TAG_WINDOW
+        while len(data_ids) > Config.AUTHENTICATED_DATA_PER_SATELLITE:
+            if self.authenticated_data_dict[data_ids[0]].last_gst >= gst_limit:
+                break
+            del self.authenticated_data_dict[data_ids.popleft()]
 
     def load_page(self, page: 'DataFormat'):
 
@@ -468,11 +581,9 @@ class NavigationDataManager:
         belonging to the same IOD. Theoretically, we should check that these words are not 4 hours old (time of
         applicability as per the Galileo OS SDD), but that case is quite rare.
 
-        The satellites with a full set of CED words are saved in a variable as it could be useful in the future.
+        The satellites with a full set of CED words are saved in a variable as it could be useful in the future. Each
+        ADKD0 data manager adds its satellite when it completes the CED words for the first time.
         """
-        for svid, adkd0_data_manager in self.adkd0_data_managers.items():
-            if svid not in self.sats_with_ced and adkd0_data_manager.satellite_has_ced:
-                self.sats_with_ced.add(svid)
         if self.ttff is None and len(self.sats_with_ced) >= 4:
             gst_page_end = Config.LAST_GST + 2  # +2 seconds because we have to receive the full page
             self.ttff = (gst_page_end - Config.FIRST_GST).tow
@@ -509,19 +620,20 @@ class NavigationDataManager:
         for data_manager in self.adkd0_data_managers.values():
             data_blocks = data_manager.adkd0_data_blocks
             if len(data_blocks) >= 2 and data_blocks[-1].last_cop > 11:
-                for data_block in list(data_manager.adkd0_data_blocks[:-1]):
-                    data_manager.adkd0_data_blocks.remove(data_block)
+                data_manager.drop_old_data_blocks()
 
     def check_authenticated_data(self):
         """
         Called every time a MACK message with a new TESLA key is received after verifying all possible tags.
-        Authenticates any data blocks possible (according to tag length)
+        Authenticates any data blocks possible (according to tag length). Only the data blocks with new tags since the
+        last call are checked, in the order they were first authenticated.
         """
         logger.info(f"Data authenticated:\n")
-        for auth_data in self.authenticated_data_dict.values():
-            if auth_data.acc_length >= Config.TAG_LENGTH and auth_data.new_tags:
+        new_authenticated_data = sorted(self.new_authenticated_data.values(), key=attrgetter('index'))
+        self.new_authenticated_data = {}
+        for auth_data in new_authenticated_data:
+            if auth_data.acc_length >= Config.TAG_LENGTH:
                 auth_data.log_authenticated()
-                auth_data.new_tags = False
                 self._calculate_TTFAF(auth_data)
         self._clean_old_data()
 
@@ -530,5 +642,5 @@ class NavigationDataManager:
         Called every time a tag is extracted from the MACK message. Checks if the COP of the tag allows to change the
         GST Start of the navigation data blocks.
         """
-        if tag.cop.uint > 1 and tag.adkd.uint == 0:
-            self.adkd0_data_managers[tag.prn_d.uint].update_gst_start_with_cop(tag)
+        if tag.cop > 1 and tag.adkd == 0:
+            self.adkd0_data_managers[tag.prn_d].update_gst_start_with_cop(tag)
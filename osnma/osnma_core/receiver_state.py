@@ -21,14 +21,17 @@ if TYPE_CHECKING:
 
 ######## imports ########
 from bitstring import BitArray
+from collections import deque
 
-from osnma.structures.fields_information import CPKS, NMAS, parse_nma_header, OSNMAlibSTATE
+from osnma.structures.fields_information import CPKS, NMAS, parse_nma_header, OSNMAlibSTATE, KS_lt, TS_lt
 from osnma.cryptographic.dsm_kroot import DSMKroot
 from osnma.cryptographic.dsm_pkr import DSMPKR
 from osnma.cryptographic.gst_class import GST
 from osnma.osnma_core.tesla_chain import TESLAChain
+from osnma.cryptographic.mack_msg_parser import MACKMessageParser
+from osnma.structures.mack_structures import MACKMessage, TESLAKey
 from osnma.osnma_core.nav_data_manager import NavigationDataManager
-from osnma.osnma_core.dsm_manager import DigitalSignatureMessageManager, DSMType
+from osnma.osnma_core.dsm_manager import DigitalSignatureMessageManager, DigitalSignatureMessage, DSMType
 from osnma.utils.iohandler import IOHandler
 from osnma.utils.exceptions import PublicKeyObjectError, TeslaKeyIndexError, MackParsingError, NMAStatusDontUseFromTag
 from osnma.utils.config import Config
@@ -39,6 +42,122 @@ import osnma.utils.logger_factory as log_factory
 logger = log_factory.get_logger(__name__)
 
 
+class MACKBacklog:
+    """
+    MACK subframes received while waiting for a verified KROOT, in reception order, with their GST, SVID and NMA
+    Status. Once the key and tag sizes of the chain in force are known from the first block of its DSM-KROOT, the
+    subframes are also parsed as they arrive, so only the tags and keys are processed when the KROOT is verified.
+
+    Subframes older than Config.MACK_BACKLOG_HORIZON seconds with respect to the newest one are dropped. If
+    Config.DO_MACK_BACKLOG_SPILL is set, the oldest subframes above Config.MACK_BACKLOG_MEMORY_SIZE are moved to the
+    Config.MACK_BACKLOG_NAME file and read back when the backlog is drained.
+    """
+
+    def __init__(self, io_handler: IOHandler):
+        self.io_handler = io_handler
+        self.mack_subframes: deque[tuple[list[BitArray | None], GST, int, BitArray, MACKMessage | None]] = deque()
+        self.mack_parser: MACKMessageParser | None = None
+        self.last_gst: GST | None = None
+        self.spilled = 0
+        self.spilled_last_gst: GST | None = None
+        self.dropped = 0
+        if Config.DO_MACK_BACKLOG_SPILL:
+            # Subframes spilled by a previous execution are not valid
+            self.io_handler.remove_file(Config.MACK_BACKLOG_NAME)
+
+    def __len__(self) -> int:
+        return len(self.mack_subframes) + self.spilled
+
+    def append(self, mack_subframe: list[BitArray | None], gst_subframe: GST, svid: int, nma_status: BitArray):
+        mack_object = None
+        if self.mack_parser is not None:
+            try:
+                mack_object = self.mack_parser.parse_mack_message(mack_subframe, gst_subframe, svid, nma_status)
+            except Exception:
+                # Parsed again when the backlog is drained, to handle the error as any other MACK message
+                mack_object = None
+        self.mack_subframes.append((mack_subframe, gst_subframe, svid, nma_status, mack_object))
+        if self.last_gst is None or self.last_gst < gst_subframe:
+            self.last_gst = gst_subframe
+            self._drop_old_subframes()
+        if Config.DO_MACK_BACKLOG_SPILL and len(self.mack_subframes) > Config.MACK_BACKLOG_MEMORY_SIZE:
+            self._spill_old_subframes()
+
+    def _get_horizon(self) -> int:
+        return self.last_gst.total_seconds - Config.MACK_BACKLOG_HORIZON
+
+    def _drop_old_subframes(self):
+        horizon = self._get_horizon()
+        if self.spilled and self.spilled_last_gst.total_seconds < horizon:
+            self.dropped += self.spilled
+            self._remove_spilled_subframes()
+        while self.mack_subframes and self.mack_subframes[0][1].total_seconds < horizon:
+            self.mack_subframes.popleft()
+            self.dropped += 1
+
+    def _spill_old_subframes(self):
+        """
+        Moves the oldest subframes to the backlog file, leaving half of the memory size so the file is not written for
+        every new subframe.
+        """
+        spill_size = len(self.mack_subframes) - Config.MACK_BACKLOG_MEMORY_SIZE // 2
+        old_subframes = [self.mack_subframes.popleft() for _ in range(spill_size)]
+        try:
+            self.io_handler.append_mack_subframes([subframe[:4] for subframe in old_subframes], Config.MACK_BACKLOG_NAME)
+        except IOError as e:
+            logger.warning(f"Unable to spill the MACK backlog to file, subframes dropped.\n\t{e}")
+            self.dropped += spill_size
+            return
+        self.spilled += spill_size
+        self.spilled_last_gst = old_subframes[-1][1]
+        logger.debug(f"{spill_size} MACK subframes waiting for KROOT moved to {Config.MACK_BACKLOG_NAME}")
+
+    def _remove_spilled_subframes(self):
+        self.io_handler.remove_file(Config.MACK_BACKLOG_NAME)
+        self.spilled = 0
+        self.spilled_last_gst = None
+
+    def set_mack_parser(self, chain_id: int, key_size: int, tag_size: int):
+        self.mack_parser = MACKMessageParser(chain_id, key_size, tag_size)
+        logger.info(f"Parsing the MACK messages waiting for KROOT with the chain {chain_id} parameters: key size "
+                    f"{key_size}, tag size {tag_size}.")
+
+    def take_mack_parser(self, tesla_chain: TESLAChain) -> MACKMessageParser | None:
+        """
+        Returns the parser used for the backlog if it has the parameters of the TESLA chain, so the parsed subframes can be
+        used and the chain can continue with the same parser state. Stops parsing new subframes.
+        """
+        mack_parser, self.mack_parser = self.mack_parser, None
+        if mack_parser is not None and (mack_parser.chain_id, mack_parser.key_size, mack_parser.tag_size) \
+                == (tesla_chain.chain_id, tesla_chain.key_size, tesla_chain.tag_size):
+            return mack_parser
+        return None
+
+    def clear(self):
+        self.mack_subframes.clear()
+        self.mack_parser = None
+        if self.spilled:
+            self._remove_spilled_subframes()
+
+    def drain(self):
+        """
+        Yields and removes the subframes in reception order, starting with the ones in the backlog file that are still
+        inside the horizon.
+        """
+        if self.spilled:
+            horizon = self._get_horizon()
+            try:
+                spilled_subframes = self.io_handler.read_mack_subframes(Config.MACK_BACKLOG_NAME)
+            except (IOError, ValueError) as e:
+                logger.warning(f"Unable to read the MACK backlog file, subframes dropped.\n\t{e}")
+                spilled_subframes = []
+            self._remove_spilled_subframes()
+            self.mack_subframes.extendleft(reversed(
+                [(*subframe, None) for subframe in spilled_subframes if subframe[1].total_seconds >= horizon]))
+        while self.mack_subframes:
+            yield self.mack_subframes.popleft()
+
+
 class ReceiverState:
 
     def __init__(self):
@@ -63,7 +182,10 @@ class ReceiverState:
 
         self.dsm_manager = DigitalSignatureMessageManager()
 
-        self.mack_waiting_for_kroot: list[tuple[list[BitArray | None], GST, int, BitArray]] = []
+        self.mack_waiting_for_kroot = MACKBacklog(self.io_handler)
+        self.last_stored_tesla_key_gst: GST | None = None
+        self.cold_start_kroot: tuple[BitArray, BitArray] | None = None
+        """ Last DSM-KROOT received in cold start, verified as soon as the public key is authenticated """
 
         self._initialize_status()
 
@@ -95,6 +217,7 @@ class ReceiverState:
                             self.last_received_nmas = nmah_bits[:2]
                             self.nma_header = nmah_bits
                             self.tesla_chain_force = TESLAChain(self.nav_data_structure, dsm_kroot)
+                            self._load_stored_tesla_key()
                             self.current_pkid = dsm_kroot.get_value('PKID').uint
                             self.osnmalib_state = OSNMAlibSTATE.HOT_START
                             logger.info(f"KROOT read with NMA Status {self.nma_status.name} and Chain Status {self.chain_status.name}. Start status {self.osnmalib_state.name}\n")
@@ -105,6 +228,48 @@ class ReceiverState:
                     except PublicKeyObjectError:
                         logger.warning('Saved Key Root PKID is not consistent with the stored Public Key. Not used.')
 
+    def _load_stored_tesla_key(self):
+        """
+        Loads the last TESLA key stored in a previous execution if it belongs to the chain of the KROOT read.
+        """
+        if not Config.DO_TESLA_KEY_STORE:
+            return
+        try:
+            kroot, chain_id, tesla_key = self.io_handler.read_tesla_key(Config.TESLA_KEY_NAME)
+        except IOError as e:
+            logger.info(e)
+            return
+
+        if kroot != self.tesla_chain_force.root_tesla_key.key or chain_id != self.tesla_chain_force.chain_id:
+            logger.info(f"Stored TESLA key does not belong to the chain of the KROOT read. Not used.")
+            return
+
+        if not self.tesla_chain_force.set_resume_key(tesla_key):
+            logger.info(f"Stored TESLA key index {tesla_key.index} is not consistent with its GST {tesla_key.gst_sf}. "
+                        f"Not used.")
+            return
+        self.last_stored_tesla_key_gst = tesla_key.gst_sf
+        logger.info(f"TESLA key {tesla_key.index} read from previous execution.")
+
+    def _store_tesla_key(self):
+        """
+        If Config.DO_TESLA_KEY_STORE is set, stores the last verified TESLA key of the chain in force, at most once per
+        TESLA_KEY_STORE_INTERVAL seconds.
+        """
+        if not Config.DO_TESLA_KEY_STORE:
+            return
+        tesla_chain = self.tesla_chain_force
+        last_tesla_key = tesla_chain.last_tesla_key
+        if last_tesla_key.is_kroot:
+            return
+        if (self.last_stored_tesla_key_gst is not None and last_tesla_key.gst_sf.total_seconds
+                - self.last_stored_tesla_key_gst.total_seconds < Config.TESLA_KEY_STORE_INTERVAL):
+            return
+
+        self.io_handler.store_tesla_key(tesla_chain.root_tesla_key.key, tesla_chain.chain_id, last_tesla_key,
+                                        Config.TESLA_KEY_NAME)
+        self.last_stored_tesla_key_gst = last_tesla_key.gst_sf
+
     def _subframe_actions(self, nma_header: BitArray):
         if self.chain_status == CPKS.EOC:
             current_chain_in_force = nma_header[2:4].uint
@@ -127,7 +292,7 @@ class ReceiverState:
 
         self.tesla_chain_force = None
         self.next_tesla_chain = None
-        self.mack_waiting_for_kroot = []
+        self.mack_waiting_for_kroot.clear()
 
         self.current_pkid = None
 
@@ -230,12 +395,15 @@ class ReceiverState:
         else:
             logger.error(f"CPKS {new_cpks} not valid")
 
-    def _process_individual_mack_subframe(self, mack_subframe: list[BitArray], gst_subframe: GST, svid: int, nma_status: BitArray, is_waiting_mack=False):
+    def _process_individual_mack_subframe(self, mack_subframe: list[BitArray], gst_subframe: GST, svid: int, nma_status: BitArray, is_waiting_mack=False,
+                                          mack_object: MACKMessage | None = None, processed_key: TESLAKey | None = None):
         try:
             if is_waiting_mack:
-                tesla_key = self.tesla_chain_force.parse_mack_message(mack_subframe, gst_subframe, svid, nma_status, do_log=False)
+                tesla_key = self.tesla_chain_force.parse_mack_message(mack_subframe, gst_subframe, svid, nma_status, do_log=False,
+                                                                      mack_object=mack_object)
             else:
-                tesla_key = self.tesla_chain_force.parse_mack_message(mack_subframe, gst_subframe, svid, nma_status)
+                tesla_key = self.tesla_chain_force.parse_mack_message(mack_subframe, gst_subframe, svid, nma_status,
+                                                                      processed_key=processed_key)
         except NMAStatusDontUseFromTag as e:
             logger.warning(f"Tag authenticated with NMA Status to Dont Use. Stopping navigation data processing.")
             self.nma_status = NMAS.DONT_USE
@@ -243,17 +411,22 @@ class ReceiverState:
             logger.error(f"Unable to parse the MACK message correctly.\n{e}")
             if self.osnmalib_state == OSNMAlibSTATE.HOT_START:
                 self._fallback_to_state(OSNMAlibSTATE.WARM_START)
-                self.mack_waiting_for_kroot.append((mack_subframe, gst_subframe, svid, self.last_received_nmas))
+                self.mack_waiting_for_kroot.append(mack_subframe, gst_subframe, svid, self.last_received_nmas)
         except TeslaKeyIndexError as e:
             if not is_waiting_mack:
                 logger.error(e)
             if self.osnmalib_state == OSNMAlibSTATE.HOT_START:
                 self._fallback_to_state(OSNMAlibSTATE.WARM_START)
-                self.mack_waiting_for_kroot.append((mack_subframe, gst_subframe, svid, self.last_received_nmas))
+                self.mack_waiting_for_kroot.append(mack_subframe, gst_subframe, svid, self.last_received_nmas)
         else:
-            if self.osnmalib_state == OSNMAlibSTATE.HOT_START and tesla_key is not None and tesla_key.verified:
-                self.osnmalib_state = OSNMAlibSTATE.STARTED
-                logger.info(f"One TESLA key verified. Start Status: {self.osnmalib_state.name}")
+            self._tesla_key_processed(tesla_key)
+
+    def _tesla_key_processed(self, tesla_key: TESLAKey | None):
+        if self.osnmalib_state == OSNMAlibSTATE.HOT_START and tesla_key is not None and tesla_key.verified:
+            self.osnmalib_state = OSNMAlibSTATE.STARTED
+            logger.info(f"One TESLA key verified. Start Status: {self.osnmalib_state.name}")
+        if tesla_key is not None and tesla_key.verified:
+            self._store_tesla_key()
 
     def process_kroot_message(self, nma_header: BitArray, kroot: BitArray):
         """
@@ -262,6 +435,7 @@ class ReceiverState:
         receivers list.
         """
         if self.osnmalib_state == OSNMAlibSTATE.COLD_START:
+            self.cold_start_kroot = (nma_header, kroot)
             return
 
         try:
@@ -287,7 +461,24 @@ class ReceiverState:
                     self._fallback_to_state(OSNMAlibSTATE.COLD_START)
             StatusLogger.log_auth_kroot(dsm_kroot)
 
-    def process_pkr_message(self, pkr: BitArray):
+    def _process_cold_start_kroot(self, nma_header: BitArray | None):
+        """
+        Does not wait for the next DSM-KROOT if it was already received in cold start signed with a verified public key
+        (PKID). Only if it was received with the NMA header of the current subframe, otherwise the NMA or chain status
+        may have changed since and the next DSM-KROOT is used.
+        """
+        cold_start_kroot, self.cold_start_kroot = self.cold_start_kroot, None
+        if cold_start_kroot is None or cold_start_kroot[1][4:8].uint not in self.pkr_dict:
+            return
+        if nma_header is None or cold_start_kroot[0] != nma_header:
+            logger.info("DSM-KROOT received in cold start not used, the NMA header changed. Waiting for the next one.")
+            return
+        self.process_kroot_message(*cold_start_kroot)
+
+    def process_pkr_message(self, pkr: BitArray, nma_header: BitArray | None = None):
+        """
+        Verifies the DSM-PKR received with the NMA header of the subframe that completed it.
+        """
 
         dsm_pkr = DSMPKR(pkr_message=pkr)
         npkid = dsm_pkr.get_value('NPKID').uint
@@ -315,10 +506,25 @@ class ReceiverState:
             if self.osnmalib_state == OSNMAlibSTATE.COLD_START:
                 self.osnmalib_state = OSNMAlibSTATE.WARM_START
                 logger.info(f"Start status from {OSNMAlibSTATE.COLD_START.name} to {self.osnmalib_state.name}")
+                self._process_cold_start_kroot(nma_header)
         else:
             logger.error(f"PKR verification failed! PRK received: NPKID {npkid}, NPKT {dsm_pkr.get_value('NPKT').uint}, MID {dsm_pkr.get_value('MID').uint}.")
         StatusLogger.log_auth_pkr(dsm_pkr)
 
+    def _set_mack_backlog_parser(self, nma_header: BitArray, dsm: DigitalSignatureMessage):
+        """
+        Starts parsing the MACK messages waiting for KROOT if the first block of the DSM-KROOT of the chain in force has
+        been received. The parameters are not authenticated: the parsed messages are only used if the verified KROOT
+        has the same chain ID, key size and tag size.
+        """
+        cidkr = dsm.get_kroot_header_field('CIDKR')
+        if cidkr is None or cidkr != nma_header[2:4].uint:
+            return
+        key_size = KS_lt[dsm.get_kroot_header_field('KS')]
+        tag_size = TS_lt[dsm.get_kroot_header_field('TS')]
+        if isinstance(key_size, int) and isinstance(tag_size, int):
+            self.mack_waiting_for_kroot.set_mack_parser(cidkr, key_size, tag_size)
+
     def process_hkroot_subframe(self, hkroot_sf: BitArray, is_consecutive_hkroot=False):
 
         if self.osnmalib_state == OSNMAlibSTATE.OSNMA_AM:
@@ -327,6 +533,10 @@ class ReceiverState:
 
         nma_header, dsm = self.dsm_manager.new_dsm_subframe(hkroot_sf)
 
+        if (self.osnmalib_state in [OSNMAlibSTATE.COLD_START, OSNMAlibSTATE.WARM_START]
+                and dsm.dsm_type == DSMType.DSM_KROOT and self.mack_waiting_for_kroot.mack_parser is None):
+            self._set_mack_backlog_parser(nma_header, dsm)
+
         if is_consecutive_hkroot:
             self._subframe_actions(nma_header)
 
@@ -334,23 +544,87 @@ class ReceiverState:
             if dsm.dsm_type == DSMType.DSM_KROOT:
                 self.process_kroot_message(nma_header, dsm.get_message())
             else:
-                self.process_pkr_message(dsm.get_message())
+                self.process_pkr_message(dsm.get_message(), nma_header)
 
     def process_mack_subframe(self, mack_subframe: list[BitArray | None], gst_subframe: GST, satellite: 'Satellite'):
 
         if self.nma_status == NMAS.DONT_USE:
             logger.warning(f"NMA Status: Don't Use. Navigation data authentication not performed.")
-            self.mack_waiting_for_kroot = []
+            self.mack_waiting_for_kroot.clear()
             return
 
         if self.osnmalib_state in [OSNMAlibSTATE.COLD_START, OSNMAlibSTATE.WARM_START]:
-            self.mack_waiting_for_kroot.append((mack_subframe, gst_subframe, satellite.svid, self.last_received_nmas))
+            self.mack_waiting_for_kroot.append(mack_subframe, gst_subframe, satellite.svid, self.last_received_nmas)
         else:
-            while len(self.mack_waiting_for_kroot) != 0:
-                (w_mack_subframe, w_gst, w_svid, w_nmas) = self.mack_waiting_for_kroot.pop(0)
+            mack_parser = self.mack_waiting_for_kroot.take_mack_parser(self.tesla_chain_force)
+            for (w_mack_subframe, w_gst, w_svid, w_nmas, w_mack_object) in self.mack_waiting_for_kroot.drain():
                 logger.info(f"-- OLD SUBFRAME -- WN {w_gst.wn} TOW {w_gst.tow} SVID {w_svid:02} --")
-                self._process_individual_mack_subframe(w_mack_subframe, w_gst, w_svid, w_nmas, is_waiting_mack=True)
-            self._process_individual_mack_subframe(mack_subframe, gst_subframe, satellite.svid, self.last_received_nmas)
+                self._process_individual_mack_subframe(w_mack_subframe, w_gst, w_svid, w_nmas, is_waiting_mack=True,
+                                                       mack_object=w_mack_object if mack_parser else None)
+            if mack_parser is not None and self.tesla_chain_force is not None:
+                # Continue with the TESLA key reconstruction state of the last subframes parsed
+                self.tesla_chain_force.mac_msg_parser = mack_parser
+            self._process_individual_mack_subframe(mack_subframe, gst_subframe, satellite.svid, self.last_received_nmas,
+                                                   processed_key=satellite.tesla_key)
+
+    def process_tesla_key_pages(self, gst_subframe: GST, satellite: 'Satellite', page_number: int):
+        """
+        Adds the TESLA key of the MACK message of the satellite to the chain in force as soon as the pages with the key
+        have been received, so a new key releases the tags waiting for it without waiting for the end of the subframe.
+        The key is parsed once, when the page with its last bits is received. Only done if the NMA header of the
+        subframe has the CID of the chain in force and does not change the chain or NMA status, otherwise the key is
+        processed at the end of the subframe with the rest of the MACK message.
+        """
+        if (self.osnmalib_state not in [OSNMAlibSTATE.HOT_START, OSNMAlibSTATE.STARTED]
+                or self.nma_status == NMAS.DONT_USE or self.tesla_chain_force is None):
+            return
+        if page_number < self.tesla_chain_force.last_tesla_key_page:
+            return
+        # Not parsed again with the next pages of the subframe
+        satellite.set_tesla_key_processed(None)
+
+        nma_header = satellite.get_hkroot_subframe()[0]
+        if (nma_header is None or nma_header[2:4].uint != self.tesla_chain_force.chain_id
+                or nma_header[4:7].uint in [CPKS.EOC, CPKS.CREV] or nma_header[:2].uint == NMAS.DONT_USE):
+            return
+
+        try:
+            tesla_key = self.tesla_chain_force.parse_tesla_key(satellite.get_mack_subframe(), gst_subframe, satellite.svid)
+        except MackParsingError:
+            return
+        if tesla_key is None:
+            return
+        if tesla_key.calculate_index(self.tesla_chain_force.GST0) < 0:
+            # Handled with the rest of the MACK message
+            return
+
+        satellite.set_tesla_key_processed(tesla_key)
+        try:
+            self.tesla_chain_force.process_tesla_key(tesla_key)
+        except NMAStatusDontUseFromTag as e:
+            # The warning is logged when the MACK message of the satellite is processed at the end of the subframe
+            self.nma_status = NMAS.DONT_USE
+        else:
+            self._tesla_key_processed(tesla_key)
+
+    def continue_tesla_chain_catch_up(self):
+        """
+        Continues the time sliced verification of a TESLA key of the chain in force, if there is one in progress.
+        """
+        if self.tesla_chain_force is None or self.tesla_chain_force.catch_up is None:
+            return
+
+        try:
+            key_verified = self.tesla_chain_force.continue_catch_up()
+        except NMAStatusDontUseFromTag as e:
+            logger.warning(f"Tag authenticated with NMA Status to Dont Use. Stopping navigation data processing.")
+            self.nma_status = NMAS.DONT_USE
+        else:
+            if key_verified:
+                if self.osnmalib_state == OSNMAlibSTATE.HOT_START:
+                    self.osnmalib_state = OSNMAlibSTATE.STARTED
+                    logger.info(f"One TESLA key verified. Start Status: {self.osnmalib_state.name}")
+                self._store_tesla_key()
 
     def load_last_nma_status(self, nma_status: BitArray):
         if nma_status is not None:
@@ -22,34 +22,82 @@ if TYPE_CHECKING:
     from osnma.osnma_core.nav_data_manager import NavigationDataManager
 
 ######## imports ########
-from osnma.structures.maclt import mac_lookup_table
 from osnma.structures.fields_information import NMAS
 from osnma.cryptographic.gst_class import GST
 from osnma.utils.config import Config
 from osnma.utils.status_logger import StatusLogger
 from osnma.utils.exceptions import NMAStatusDontUseFromTag
 
+import heapq
+from operator import itemgetter
+from collections import deque
+
 ######## logger ########
 import osnma.utils.logger_factory as logger_factory
 logger = logger_factory.get_logger(__name__)
 
 
-def verify_maclt_slot(tag: 'TagAndInfo', slot: str):
-    slot_adkd = int(slot[:2])
-    slot_type = slot[2]
-
-    slot_verified = False
-    if slot_adkd == tag.adkd.uint:
-        if slot_type == 'S' and tag.prn_a == tag.prn_d:
-            slot_verified = True
-        elif slot_type == 'E' and tag.prn_d.uint in range(1, 37):
-            slot_verified = True
-        elif slot_type in 'SE' and tag.prn_d.uint == 255:
-            slot_verified = True
-        elif slot_type == 'G' and tag.prn_d.uint in range(64, 96):
-            slot_verified = True
-
-    return slot_verified
+class PendingKeyQueue:
+    """
+    Tags or MACSEQs waiting for their TESLA key, stored in buckets by key index. Releasing a key index returns the
+    content of all the buckets at or below it in arrival order, without going through the rest of the buckets.
+
+    The queue is bounded: buckets of keys too old are expired and, above `max_size` elements, the buckets of the
+    oldest keys are evicted.
+    """
+
+    def __init__(self, max_size: int):
+        self.buckets: dict[int, list[tuple[int, 'TagAndInfo | MACSeqObject']]] = {}
+        self.key_id_heap: list[int] = []
+        self.arrival_counter = 0
+        self.size = 0
+        self.max_size = max_size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, mack_structure: 'TagAndInfo | MACSeqObject'):
+        bucket = self.buckets.get(mack_structure.key_id)
+        if bucket is None:
+            bucket = self.buckets[mack_structure.key_id] = []
+            heapq.heappush(self.key_id_heap, mack_structure.key_id)
+        bucket.append((self.arrival_counter, mack_structure))
+        self.arrival_counter += 1
+        self.size += 1
+        if self.size > self.max_size:
+            key_id = self.key_id_heap[0]
+            evicted = self._pop_oldest_bucket()
+            logger.info(f"Evicted {evicted} elements waiting for the TESLA key {key_id}, more than {self.max_size} "
+                        f"elements waiting.")
+
+    def extend(self, mack_structures: list['TagAndInfo | MACSeqObject']):
+        for mack_structure in mack_structures:
+            self.append(mack_structure)
+
+    def release(self, key_index: int) -> list['TagAndInfo | MACSeqObject']:
+        released = []
+        released_buckets = 0
+        while self.key_id_heap and self.key_id_heap[0] <= key_index:
+            released.extend(self.buckets.pop(heapq.heappop(self.key_id_heap)))
+            released_buckets += 1
+        if released_buckets > 1:
+            released.sort(key=itemgetter(0))
+        self.size -= len(released)
+        return [mack_structure for _, mack_structure in released]
+
+    def _pop_oldest_bucket(self) -> int:
+        bucket_size = len(self.buckets.pop(heapq.heappop(self.key_id_heap)))
+        self.size -= bucket_size
+        return bucket_size
+
+    def expire(self, key_index: int) -> int:
+        """
+        Removes the buckets with a key index lower than `key_index` and returns the number of elements removed.
+        """
+        expired = 0
+        while self.key_id_heap and self.key_id_heap[0] < key_index:
+            expired += self._pop_oldest_bucket()
+        return expired
 
 
 class TagStateStructure:
@@ -57,17 +105,42 @@ class TagStateStructure:
     def __init__(self, tesla_chain: 'TESLAChain', nav_data_m: 'NavigationDataManager'):
         self.tesla_chain = tesla_chain
         self.nav_data_m = nav_data_m
-        self.maclt_dict = mac_lookup_table[tesla_chain.maclt]
-        self.macseq_awaiting_key: list['MACSeqObject'] = []
-        self.tags_awaiting_key: list['TagAndInfo'] = []
-        self.tags_with_key_awaiting_data: list['TagAndInfo'] = []
-        """ This list contains tags only for a subframe for the COP optimization """
+        self.macseq_awaiting_key = PendingKeyQueue(Config.PENDING_TAGS_MAX)
+        self.tags_awaiting_key = PendingKeyQueue(Config.PENDING_TAGS_MAX)
+        self.tags_with_key_awaiting_data: deque['TagAndInfo'] = deque(maxlen=Config.PENDING_TAGS_MAX)
+        """ This queue contains tags only for a subframe for the COP optimization, the oldest are dropped when full """
 
     def verify_tag(self, tag: 'TagAndInfo'):
-        if tag.authenticate(self.tesla_chain.mac_function):
+        self._register_tag_result(tag, tag.authenticate(self.tesla_chain.mac_function))
+
+    def verify_tags(self, tag_list: list['TagAndInfo']):
+        """
+        Authenticates a list of tags with key and data. The MACs are computed grouped by TESLA key, and then the results
+        are logged and loaded in the navigation data manager in the order of the list, as in :meth:`verify_tag`.
+        """
+        tags_by_key: dict[bytes, list[int]] = {}
+        for position, tag in enumerate(tag_list):
+            tags_by_key.setdefault(tag.tesla_key.key, []).append(position)
+
+        computed_tags: list[bytes | None] = [None] * len(tag_list)
+        for key, positions in tags_by_key.items():
+            macs = self.tesla_chain.compute_macs(key, [tag_list[position].get_auth_data() for position in positions])
+            for position, mac in zip(positions, macs):
+                computed_tags[position] = mac
+
+        for position, tag in enumerate(tag_list):
+            try:
+                self._register_tag_result(tag, tag.check_mac(computed_tags[position]))
+            except NMAStatusDontUseFromTag:
+                # Keep the tags not processed waiting, as they were before the release
+                self.tags_awaiting_key.extend(tag_list[position + 1:])
+                raise
+
+    def _register_tag_result(self, tag: 'TagAndInfo', is_verified: bool):
+        if is_verified:
             logger.info(f"Tag AUTHENTICATED\n\t{tag.get_log()}")
             StatusLogger.log_auth_tag(tag)
-            if NMAS(tag.nma_status.uint) == NMAS.DONT_USE:
+            if NMAS(tag.nma_status) == NMAS.DONT_USE:
                 raise NMAStatusDontUseFromTag(f"Tag authenticated with NMA Status to Dont Use. {tag.get_log()}")
             if not tag.is_dummy:
                 self.nav_data_m.new_tag_verified(tag)
@@ -82,12 +155,11 @@ class TagStateStructure:
             logger.info(f"MACSEQ AUTHENTICATED\n\t{macseq.get_log()}")
         else:
             logger.error(f"MACSEQ FAILED\n\t{macseq.get_log()}")
-        self.macseq_awaiting_key.remove(macseq)
         StatusLogger.log_auth_macseq(macseq)
 
     def set_key_index_to_tags(self, tag_list: list['TagAndInfo']):
         for tag in tag_list:
-            if tag.adkd.uint != 12:
+            if tag.adkd != 12:
                 tag.key_id = self.tesla_chain.get_key_index(tag.gst_subframe) + 1
             else:
                 tag.key_id = self.tesla_chain.get_key_index(tag.gst_subframe) + 11
@@ -102,25 +174,19 @@ class TagStateStructure:
         flex_list = []
         tags_log = []
 
-        if self.maclt_dict['sections'] == 1:
-            sequence = self.maclt_dict["sequence"]
-        elif self.maclt_dict['sections'] == 2:
-            sf_index = 1 if mack_message.gst_sf.tow % 60 else 0
-            sequence = self.maclt_dict["sequence"][sf_index]
-        else:
-            raise ValueError(f"MACLT {self.tesla_chain.maclt} sections not 1 nor 2: {self.maclt_dict['sections']}")
-
-        if self.maclt_dict['NMACK'] != 1:
-            logger.critical(f"MACLT number {self.maclt_dict['ID']} NOT SUPPORTED. With the new ICD only 1 MACK block"
+        maclt_sections = self.tesla_chain.maclt_sections
+        if maclt_sections is None:
+            logger.critical(f"MACLT number {self.tesla_chain.maclt} NOT SUPPORTED. With the new ICD only 1 MACK block"
                             f"per MACK message is supported")
             exit(1)
+        sequence = maclt_sections[1 if len(maclt_sections) == 2 and mack_message.gst_sf.tow % 60 else 0]
 
         is_flx_tag_missing = False
 
-        for tag, slot in zip(mack_message.tags, sequence):
-            if slot != 'FLX':
+        for tag, (slot_adkd, prn_predicate, is_flx, slot) in zip(mack_message.tags, sequence):
+            if not is_flx:
                 if tag is not None:
-                    if verify_maclt_slot(tag, slot):
+                    if slot_adkd == tag.adkd and prn_predicate(tag.prn_a, tag.prn_d):
                         tag_list.append(tag)
                     else:
                         logger.error(f"TAG - MACLT ERROR:\n\t{slot}\t{tag}\n")
@@ -149,15 +215,13 @@ class TagStateStructure:
 
         # Clear tags with key awaiting data if all satellites from the past subframe are processed
         if len(self.tags_with_key_awaiting_data) > 0 and self.tags_with_key_awaiting_data[0].gst_subframe + 30 < gst_sf:
-            self.tags_with_key_awaiting_data = []
+            self.tags_with_key_awaiting_data.clear()
             return
 
         # Try to authenticate tags with a key received in the current subframe
-        for tag in list(self.tags_with_key_awaiting_data):
-            tag.nav_data = self.nav_data_m.get_data(tag)
-            if tag.nav_data is not None:
-                self.verify_tag(tag)
-                self.tags_with_key_awaiting_data.remove(tag)
+        tags_awaiting_data = list(self.tags_with_key_awaiting_data)
+        self.tags_with_key_awaiting_data.clear()
+        self._verify_tags_with_data(tags_awaiting_data)
 
         self.nav_data_m.check_authenticated_data()
 
@@ -167,9 +231,9 @@ class TagStateStructure:
         valid satellites. The list of valid PRN_D is currently 1-36.
         """
         for tag in tag_list:
-            if tag.adkd.uint not in Config.ACTIVE_ADKD:
+            if tag.adkd not in Config.ACTIVE_ADKD:
                 continue
-            prn_d = tag.prn_d.uint
+            prn_d = tag.prn_d
             if prn_d not in range(1, Config.NS+1):
                 logger.warning(f"Tag {tag} authenticating a PRN_D not implemented.")
                 continue
@@ -182,47 +246,79 @@ class TagStateStructure:
         """
         if Config.TS > 330:
             return True
-        elif Config.TS > 30 and tag.adkd.uint != 12:
+        elif Config.TS > 30 and tag.adkd != 12:
             return True
         else:
             return False
 
+    def _verify_tags_with_data(self, tag_list: list['TagAndInfo']):
+        """
+        Authenticates with :meth:`verify_tags` the tags of the list, all with a verified key, for which the navigation
+        data has been received. A cross-authentication tag is verified after the ADKD0 tags of its satellite pending
+        verification, because its data may depend on the COP of those tags. If the COP data link optimization is
+        active, the tags without data wait for it in tags_with_key_awaiting_data.
+        """
+        tags_to_verify = []
+        svids_with_cop_update = set()
+        for position, tag in enumerate(tag_list):
+            if tag.prn_a != tag.prn_d and tag.prn_d in svids_with_cop_update and tag.adkd != 4:
+                try:
+                    self.verify_tags(tags_to_verify)
+                except NMAStatusDontUseFromTag:
+                    self.tags_awaiting_key.extend(tag_list[position:])
+                    raise
+                tags_to_verify = []
+                svids_with_cop_update.clear()
+            tag.nav_data = self.nav_data_m.get_data(tag)
+            if tag.nav_data is not None:
+                tags_to_verify.append(tag)
+                if tag.adkd == 0 and not tag.is_dummy:
+                    svids_with_cop_update.add(tag.prn_d)
+            elif Config.DO_COP_LINK_OPTIMIZATION:
+                # The key has arrived but no data
+                self.tags_with_key_awaiting_data.append(tag)
+
+        self.verify_tags(tags_to_verify)
+
     def update_tag_lists(self):
         """
         Authenticates the MACSEQ of that key and adds the tags to the list. Then authenticates all tags that have
         a valid TESLA key and for which data has been received. If no data has been received, delete the tag.
+        Only the buckets of the pending queues with a key index up to the last verified key are visited.
 
         Then informs the NavigationDataManager that new data might be authentic.
         """
 
+        last_key_index = self.tesla_chain.last_tesla_key.index
+
         # Check for MACSEQ key to update tag list
-        for macseq in list(self.macseq_awaiting_key):
+        for macseq in self.macseq_awaiting_key.release(last_key_index):
             if self.tesla_chain.key_check(macseq):
                 self.verify_macseq(macseq)
 
         # Check if any tags has key and data
         logger.info("Tag verification:\n")
-        for tag in list(self.tags_awaiting_key):
-
-            if self._filter_tag_by_TL(tag):
-                self.tags_awaiting_key.remove(tag)
-                continue
-
-            if self.tesla_chain.key_check(tag):
-                # Has a verified key
-                tag.nav_data = self.nav_data_m.get_data(tag)
-                if tag.nav_data is not None:
-                    self.verify_tag(tag)
-                else:
-                    # The key has arrived but no data
-                    if Config.DO_COP_LINK_OPTIMIZATION:
-                        self.tags_with_key_awaiting_data.append(tag)
-                self.tags_awaiting_key.remove(tag)
+        released_tags = self.tags_awaiting_key.release(last_key_index)
+        self._verify_tags_with_data([tag for tag in released_tags
+                                     if not self._filter_tag_by_TL(tag) and self.tesla_chain.key_check(tag)])
 
         # Check if any data can be authenticated
         self.nav_data_m.check_authenticated_data()
 
+    def _expire_pending(self, gst_sf: GST):
+        """
+        Removes the tags and MACSEQs waiting for a key transmitted more than PENDING_TAGS_TTL seconds before the
+        subframe. Their key will never be verified if it has not been so far.
+        """
+        min_key_id = self.tesla_chain.get_key_index(gst_sf - Config.PENDING_TAGS_TTL) + 1
+        expired_tags = self.tags_awaiting_key.expire(min_key_id)
+        expired_macseqs = self.macseq_awaiting_key.expire(min_key_id)
+        if expired_tags or expired_macseqs:
+            logger.info(f"Expired {expired_tags} tags and {expired_macseqs} MACSEQs waiting for a TESLA key older than "
+                        f"{Config.PENDING_TAGS_TTL} seconds.")
+
     def load_mack_message(self, mack_message: 'MACKMessage') -> list[dict | None]:
+        self._expire_pending(mack_message.gst_sf)
         tag_list, flex_list, macseq, is_flx_tag_missing, tags_log = self.verify_maclt(mack_message)
         self.set_key_index_to_tags(tag_list)
         if macseq and not is_flx_tag_missing:
@@ -18,7 +18,7 @@
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from osnma.osnma_core.nav_data_manager import NavigationDataManager
-    from osnma.structures.mack_structures import MACSeqObject, TagAndInfo
+    from osnma.structures.mack_structures import MACSeqObject, TagAndInfo, MACKMessage
 
 ######## imports ########
 from osnma.cryptographic.dsm_kroot import DSMKroot
@@ -27,7 +27,9 @@ from osnma.cryptographic.gst_class import GST
 from osnma.osnma_core.tag_verification import TagStateStructure
 from osnma.structures.fields_information import HF, KS_lt, TS_lt, MF
 from osnma.structures.mack_structures import TESLAKey
+from osnma.structures.maclt import compile_maclt
 from osnma.utils.status_logger import StatusLogger
+from osnma.utils.config import Config
 from osnma.utils.exceptions import FieldValueNotRecognized, TeslaKeyIndexError, MackParsingError
 
 from Crypto.Hash import CMAC
@@ -37,11 +39,110 @@ from bitstring import BitArray
 import hashlib
 import hmac
 import traceback
+from time import perf_counter
+from collections import OrderedDict, deque
+from bisect import bisect_left, bisect_right, insort
 
 ######## logger ########
 import osnma.utils.logger_factory as logger_factory
 logger = logger_factory.get_logger(__name__)
 
+MAC_CONTEXT_CACHE_SIZE = 8
+
+
+class TESLAKeyCache:
+    """Bounded LRU cache of TESLA keys indexed by their index in the chain. The keys stored are derived from a verified
+    key, so a hit can be used directly to authenticate tags and MACSEQs. Keys older than `max_age` seconds with respect
+    to the last verified key are evicted.
+    """
+
+    def __init__(self, max_size: int, max_age: int):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.keys: OrderedDict[int, TESLAKey] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, index: int) -> TESLAKey | None:
+        tesla_key = self.keys.get(index)
+        if tesla_key is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.keys.move_to_end(index)
+        return tesla_key
+
+    def add(self, tesla_key: TESLAKey):
+        self.keys[tesla_key.index] = tesla_key
+        self.keys.move_to_end(tesla_key.index)
+        if len(self.keys) > self.max_size:
+            self.keys.popitem(last=False)
+
+    def evict_older_than(self, gst: GST):
+        # Derived keys can be older than keys already cached, so the insertion order is not the order of age. The
+        # cache is bounded by max_size, scanning all the keys is cheap.
+        oldest_gst = gst.total_seconds - self.max_age
+        old_indexes = [index for index, tesla_key in self.keys.items() if tesla_key.gst_sf.total_seconds < oldest_gst]
+        for index in old_indexes:
+            del self.keys[index]
+
+
+class TESLAKeyCheckpoints:
+    """Sparse table of TESLA keys linked to the last verified key. Keys with an index multiple of `interval` are kept
+    for the whole chain, and the `recent_size` most recent ones are kept in addition. Any key of the chain can then be
+    verified or derived starting from the nearest checkpoint, bounding the number of hashes per operation.
+    """
+
+    def __init__(self, interval: int, recent_size: int):
+        self.interval = interval
+        self.recent_size = recent_size
+        self.indexes: list[int] = []
+        self.keys: dict[int, TESLAKey] = {}
+        self.recent: deque[int] = deque()
+
+    def add(self, tesla_key: TESLAKey):
+        index = tesla_key.index
+        if index in self.keys:
+            return
+        insort(self.indexes, index)
+        self.keys[index] = tesla_key
+
+        if index % self.interval != 0:
+            self.recent.append(index)
+            if len(self.recent) > self.recent_size:
+                old_index = self.recent.popleft()
+                del self.indexes[bisect_left(self.indexes, old_index)]
+                del self.keys[old_index]
+
+    def is_sparse_index(self, index: int) -> bool:
+        return index % self.interval == 0
+
+    def get_above(self, index: int) -> TESLAKey | None:
+        """Returns the checkpoint with the lowest index greater or equal than `index`."""
+        position = bisect_left(self.indexes, index)
+        return self.keys[self.indexes[position]] if position < len(self.indexes) else None
+
+    def get_below(self, index: int) -> TESLAKey | None:
+        """Returns the checkpoint with the highest index lower or equal than `index`."""
+        position = bisect_right(self.indexes, index)
+        return self.keys[self.indexes[position - 1]] if position > 0 else None
+
+
+class TESLAChainCatchUp:
+    """State of the verification of a received TESLA key, hashing the chain from the key down to the anchor key. It
+    allows to spread the hashes of a long verification over several calls.
+    """
+
+    __slots__ = ('new_tesla_key', 'tesla_key', 'anchor_key', 'is_new_key', 'sparse_keys', 'received_keys')
+
+    def __init__(self, new_tesla_key: TESLAKey, anchor_key: TESLAKey, is_new_key: bool):
+        self.new_tesla_key = new_tesla_key
+        self.tesla_key = new_tesla_key
+        self.anchor_key = anchor_key
+        self.is_new_key = is_new_key
+        self.sparse_keys: list[TESLAKey] = []
+        self.received_keys: list[TESLAKey] = []
+
 
 class TESLAChain:
     """This class represents the TESLA Chain and stores all the necessary information for it's handling. The class is
@@ -63,11 +164,12 @@ class TESLAChain:
         # Copy and conversion of the necessary parameters from the low level dsm_kroot object
         self.dsm_kroot = dsm_kroot
         self.chain_id = dsm_kroot.get_value('CIDKR').uint
-        self.alpha = dsm_kroot.get_value('ALPHA')
+        self.alpha = dsm_kroot.get_value('ALPHA').tobytes()
         self.nmack = dsm_kroot.get_value('NMACK').uint
         self.key_size = KS_lt[dsm_kroot.get_value('KS').uint]
         self.tag_size = TS_lt[dsm_kroot.get_value('TS').uint]
         self.maclt = dsm_kroot.get_value('MACLT').uint
+        self.maclt_sections = compile_maclt(self.maclt)
         self.GST0 = GST(wn=dsm_kroot.get_value('WN_K').uint, tow=dsm_kroot.get_value('TOWH_K').uint * 3600)
 
         # Define the hash function to be used during this chain
@@ -81,7 +183,8 @@ class TESLAChain:
         else:
             raise FieldValueNotRecognized(f"DMSKroot field HF value {hash_index} not recognised")
 
-        # Define the mac function to be used during this chain
+        # Define the mac function to be used during this chain, with the keyed contexts of the last keys used
+        self.mac_contexts: dict[bytes, hmac.HMAC | CMAC.CMAC] = {}
         mac_f_index = dsm_kroot.get_value('MF').uint
         if mac_f_index == MF.HMAC_SHA_256:
             self.mac_function = self._hmac256
@@ -95,19 +198,66 @@ class TESLAChain:
         root_key.set_verified(dsm_kroot.is_verified())
         self.root_tesla_key = root_key
         self.last_tesla_key = root_key
+        self.key_cache = TESLAKeyCache(Config.TESLA_KEY_CACHE_SIZE, Config.TESLA_KEY_CACHE_MAX_AGE)
+        self.checkpoints = TESLAKeyCheckpoints(Config.TESLA_KEY_CHECKPOINT_INTERVAL, Config.TESLA_KEY_RECENT_CHECKPOINTS)
+        self.checkpoints.add(root_key)
+        self.resume_tesla_key: TESLAKey | None = None
+        self.catch_up: TESLAChainCatchUp | None = None
 
         # Instantiate the auxiliary object for the tag management and parsing of messages
-        self.mac_msg_parser = MACKMessageParser(self)
+        self.mac_msg_parser = MACKMessageParser(self.chain_id, self.key_size, self.tag_size)
         self.tesla_key_gst_start_offset = self.mac_msg_parser.tesla_key_gst_start_offset
+        self.last_tesla_key_page = self.mac_msg_parser.key_pages_slice.stop - 1
         self.tags_structure = TagStateStructure(self, nav_data_structure)
 
-    def _hmac256(self, key: BitArray, message: BitArray):
-        mac = hmac.new(key=key.tobytes(), msg=message.tobytes(), digestmod=hashlib.sha256)
-        return BitArray(mac.digest())
+    def _get_mac_context(self, key: bytes):
+        """Returns the pre-keyed MAC context of a TESLA key: the HMAC-SHA-256 object with the key already absorbed or
+        the CMAC-AES object with the AES key expanded. Each message is computed on a copy of the context.
+        """
+        if (mac_context := self.mac_contexts.get(key)) is not None:
+            return mac_context
+
+        if self.mac_function == self._hmac256:
+            mac_context = hmac.new(key, digestmod=hashlib.sha256)
+        else:
+            mac_context = CMAC.new(key, ciphermod=AES)
+
+        if len(self.mac_contexts) >= MAC_CONTEXT_CACHE_SIZE:
+            del self.mac_contexts[next(iter(self.mac_contexts))]
+        self.mac_contexts[key] = mac_context
+        return mac_context
+
+    @staticmethod
+    def _hmac256_with_context(mac_context: hmac.HMAC, message: bytes) -> bytes:
+        hmac_sha256 = mac_context.copy()
+        hmac_sha256.update(message)
+        return hmac_sha256.digest()
+
+    @staticmethod
+    def _cmac_aes_with_context(mac_context: CMAC.CMAC, message: bytes) -> bytes:
+        cmac = mac_context.copy()
+        cmac.update(message)
+        return cmac.digest()
+
+    def _hmac256(self, key: bytes, message: bytes) -> bytes:
+        return self._hmac256_with_context(self._get_mac_context(key), message)
 
-    def _cmac_aes(self, key: BitArray, message: BitArray):
-        mac = CMAC.new(key.tobytes(), msg=message.tobytes(), ciphermod=AES)
-        return BitArray(mac.digest())
+    def _cmac_aes(self, key: bytes, message: bytes) -> bytes:
+        return self._cmac_aes_with_context(self._get_mac_context(key), message)
+
+    def compute_macs(self, key: bytes, messages: list[bytes]) -> list[bytes]:
+        """Computes the MAC of several messages with the same TESLA key, getting the keyed context only once.
+
+        :param key: Value of the TESLA key.
+        :param messages: Authentication data of the tags.
+        :return: List with the full MAC of each message.
+        """
+        mac_context = self._get_mac_context(key)
+        if self.mac_function == self._hmac256:
+            mac_with_context = self._hmac256_with_context
+        else:
+            mac_with_context = self._cmac_aes_with_context
+        return [mac_with_context(mac_context, message) for message in messages]
 
     def _compute_gst_subframe(self, index: int) -> GST:
         """Compute the GST of the subframe corresponding to a TESLA key index. Uses GST0, ns and nmack values to
@@ -140,14 +290,15 @@ class TESLAChain:
         """
         next_index = tesla_key.index - 1
         gst_sf = self._compute_gst_subframe(next_index)
-        key_digest = self.hash_function((tesla_key.key + gst_sf.bitarray + self.alpha).tobytes()).digest()
+        key_digest = self.hash_function(tesla_key.key + gst_sf.bytes + self.alpha).digest()
         key_value = key_digest[:(self.key_size // 8)]  # digest is a bytes object, key_size are bits
         key_gst_start = gst_sf + self.tesla_key_gst_start_offset
         computed_tesla_key = TESLAKey(gst_sf, key_value, index=next_index, gst_start=key_gst_start)
 
         return computed_tesla_key
 
-    def parse_mack_message(self, mack_message: list[BitArray], gst_sf: GST, prn_a: int, nma_status: BitArray, do_log = True)\
+    def parse_mack_message(self, mack_message: list[BitArray], gst_sf: GST, prn_a: int, nma_status: BitArray, do_log = True,
+                           mack_object: 'MACKMessage | None' = None, processed_key: TESLAKey | None = None) \
             -> TESLAKey | None:
         """Parse a MACK message bit stream. Then handles the MACK object to the tag structure to add the new tags to the
         tag list. Finally, add the key(s) received to the TESLA key chain.
@@ -160,23 +311,43 @@ class TESLAChain:
         :type gst_sf: BitArray
         :param prn_a: PRN of the satellite that broadcasted the message.
         :type prn_a: int
+        :param mack_object: MACK message already parsed with the parameters of this chain, the bit stream is not parsed.
+        :type mack_object: MACKMessage
+        :param processed_key: TESLA key of the message already added to the chain by :meth:`process_tesla_key`.
+        :type processed_key: TESLAKey
         """
 
         try:
-            mack_object = self.mac_msg_parser.parse_mack_message(mack_message, gst_sf, prn_a, nma_status)
+            if mack_object is None:
+                mack_object = self.mac_msg_parser.parse_mack_message(mack_message, gst_sf, prn_a, nma_status)
         except Exception as e:
             raise MackParsingError(f"Error parsing MACK Message from SVID {prn_a} at {gst_sf}\n{traceback.print_exc()}")
         else:
             tags_log = self.tags_structure.load_mack_message(mack_object)
-            if tesla_key := mack_object.get_key():
-                StatusLogger.log_auth_tesla_key(tesla_key)
-                verified, is_new_key = self.add_key(tesla_key)
-                if verified and is_new_key:
-                    self.tags_structure.update_tag_lists()
+            if processed_key is not None:
+                tesla_key = processed_key
+            elif tesla_key := mack_object.get_key():
+                self.process_tesla_key(tesla_key)
             if do_log:
                 StatusLogger.log_mack_data(prn_a, tags_log, tesla_key)
             return tesla_key
 
+    def parse_tesla_key(self, mack_message: list[BitArray | None], gst_sf: GST, prn_a: int) -> TESLAKey | None:
+        """Parses only the TESLA key of a MACK message, if all the pages with the key have been received.
+        """
+        try:
+            return self.mac_msg_parser.parse_tesla_key(mack_message, gst_sf, prn_a)
+        except Exception as e:
+            raise MackParsingError(f"Error parsing the TESLA key from SVID {prn_a} at {gst_sf}\n{e}")
+
+    def process_tesla_key(self, tesla_key: TESLAKey):
+        """Adds a TESLA key received to the chain and, if it is a new verified key, verifies the tags waiting for it.
+        """
+        StatusLogger.log_auth_tesla_key(tesla_key)
+        verified, is_new_key = self.add_key(tesla_key)
+        if verified and is_new_key:
+            self.tags_structure.update_tag_lists()
+
     def get_key_index(self, gst_sf: GST) -> int:
         """Computes the key index that would have a key received on the subframe specified and in the position specified
         The index is relative to the first kroot received for this chain.
@@ -192,9 +363,10 @@ class TESLAChain:
         return index
 
     def add_key(self, new_tesla_key: TESLAKey) -> (bool, int):
-        """Verifies the new tesla key by computing the necessary hashes until reaching the index of the
-        `self.last_tesla_key`. Then compares the key value. If the keys are the same, the key is verified and the
-        `self.last_tesla_key` value is updated.
+        """Verifies the new tesla key by computing the necessary hashes until reaching the index of the nearest
+        checkpoint below it, which is `self.last_tesla_key` for new keys. Then compares the key value. If the keys are
+        the same, the key is verified and, if it is a new key, the `self.last_tesla_key` value is updated. If the hashes
+        exceed `Config.TESLA_CATCH_UP_BUDGET`, the verification is completed later by :meth:`continue_catch_up`.
 
         :param new_tesla_key: TESLA Key to be added to the Chain.
         :type new_tesla_key: TESLAKey
@@ -206,51 +378,161 @@ class TESLAChain:
         new_tesla_key.calculate_index(self.GST0)
 
         if new_tesla_key.index < 0:
-            raise TeslaKeyIndexError(f"TESLA key from SVID {new_tesla_key.svid}: {new_tesla_key.key} received at"
+            raise TeslaKeyIndexError(f"TESLA key from SVID {new_tesla_key.svid}: 0x{new_tesla_key.key.hex()} received at"
                                      f" {new_tesla_key.gst_sf} has a negative key index {new_tesla_key.index} and was"
                                      f" transmitted before the TESLA key root at {self.root_tesla_key.gst_sf}.")
 
         # Copy the key reference to iterate on it
         new_key_index = new_tesla_key.index
+        if self.catch_up is not None:
+            # The key is verified once the link with the chain being computed is established
+            self.catch_up.received_keys.append(new_tesla_key)
+            return False, self.last_tesla_key.index < new_key_index
         is_new_key = (self.last_tesla_key.index < new_key_index)
-        tesla_key = new_tesla_key
-
-        key_verified = False
-        for key_index in reversed(range(new_key_index + 1)):
-            if key_index > self.last_tesla_key.index:
-                tesla_key = self._compute_next_key(tesla_key)
-            elif key_index == self.last_tesla_key.index and tesla_key.key == self.last_tesla_key.key:
-                key_verified = True
-                break
-            else:
-                e = (f"Failed authentication of TESLA key {new_tesla_key.index} from SVID {new_tesla_key.svid}: "
-                     f"{new_tesla_key.key}.{' Reconstructed.' if new_tesla_key.reconstructed else ''}"
-                     f" Received at {new_tesla_key.gst_sf}\nLast authenticated key index {self.last_tesla_key.index}"
-                     f" at {self.last_tesla_key.gst_sf}: {self.last_tesla_key.key} ")
-                logger.error(e)
-                break
+        anchor_key = self.checkpoints.get_below(new_key_index)
+        if self.resume_tesla_key and anchor_key.index < self.resume_tesla_key.index <= new_key_index:
+            # The stored key is used as anchor, it is only trusted if the received key hashes down to it
+            anchor_key = self.resume_tesla_key
+
+        catch_up = TESLAChainCatchUp(new_tesla_key, anchor_key, is_new_key)
+        key_verified = self._run_catch_up(catch_up)
+        if key_verified is None:
+            self.catch_up = catch_up
+            logger.info(f"Tesla key {new_key_index} catch-up started from key {catch_up.anchor_key.index}.")
+            return False, catch_up.is_new_key
+
+        self._end_catch_up(catch_up, key_verified)
+        return key_verified, catch_up.is_new_key
+
+    def _run_catch_up(self, catch_up: TESLAChainCatchUp) -> bool | None:
+        """Hashes the chain from the current key of the catch-up until the anchor key index and compares both keys. If
+        `Config.TESLA_CATCH_UP_BUDGET` is set, stops when the time budget is exhausted and returns None.
+        """
 
+        deadline = perf_counter() + Config.TESLA_CATCH_UP_BUDGET if Config.TESLA_CATCH_UP_BUDGET else None
+        anchor_key = catch_up.anchor_key
+        tesla_key = catch_up.tesla_key
+        while tesla_key.index > anchor_key.index:
+            tesla_key = self._compute_next_key(tesla_key)
+            if self.checkpoints.is_sparse_index(tesla_key.index):
+                catch_up.sparse_keys.append(tesla_key)
+            # At least one hash is computed per call so the catch-up always progresses
+            if deadline is not None and tesla_key.index > anchor_key.index and perf_counter() > deadline:
+                catch_up.tesla_key = tesla_key
+                return None
+
+        if tesla_key.key == anchor_key.key:
+            return True
+
+        new_tesla_key = catch_up.new_tesla_key
+        if anchor_key is self.resume_tesla_key:
+            logger.warning(f"Stored TESLA key {anchor_key.index} at {anchor_key.gst_sf} is not linked to the TESLA key"
+                           f" {new_tesla_key.index} received. Discarded, verifying from the KROOT.")
+            self.resume_tesla_key = None
+            catch_up.tesla_key = tesla_key
+            catch_up.anchor_key = self.checkpoints.get_below(tesla_key.index)
+            return self._run_catch_up(catch_up)
+
+        e = (f"Failed authentication of TESLA key {new_tesla_key.index} from SVID {new_tesla_key.svid}: "
+             f"0x{new_tesla_key.key.hex()}.{' Reconstructed.' if new_tesla_key.reconstructed else ''}"
+             f" Received at {new_tesla_key.gst_sf}\nLast authenticated key index {anchor_key.index}"
+             f" at {anchor_key.gst_sf}: 0x{anchor_key.key.hex()} ")
+        logger.error(e)
+        return False
+
+    def _end_catch_up(self, catch_up: TESLAChainCatchUp, key_verified: bool):
+        if key_verified and catch_up.anchor_key is self.resume_tesla_key:
+            self._resume_from_key()
         if key_verified:
+            new_tesla_key = catch_up.new_tesla_key
             new_tesla_key.set_verified(True)
-            self.last_tesla_key = new_tesla_key
+            if new_tesla_key.index >= self.last_tesla_key.index:
+                self.last_tesla_key = new_tesla_key
+            for sparse_key in catch_up.sparse_keys:
+                self.checkpoints.add(sparse_key)
+            self.checkpoints.add(new_tesla_key)
+            self.key_cache.add(new_tesla_key)
+            self.key_cache.evict_older_than(self.last_tesla_key.gst_sf)
             logger.info(f"Tesla key {new_tesla_key.index} Authenticated at {new_tesla_key.gst_sf}"
                         f"{' - Regenerated' if new_tesla_key.reconstructed else ''}\n")
 
-        return key_verified, is_new_key
+    def continue_catch_up(self) -> bool:
+        """Continues the catch-up of the chain started by :meth:`add_key`, if any, within the time budget. When the link
+        with the verified chain is established, the tags waiting for the keys are updated and the keys received in
+        the meantime are added to the chain.
+
+        :return: True if a TESLA key has been verified during this call.
+        :rtype: bool
+        """
+        if self.catch_up is None:
+            return False
+
+        catch_up = self.catch_up
+        key_verified = self._run_catch_up(catch_up)
+        if key_verified is None:
+            return False
+
+        self.catch_up = None
+        self._end_catch_up(catch_up, key_verified)
+        if key_verified and catch_up.is_new_key:
+            self.tags_structure.update_tag_lists()
+
+        for received_key in catch_up.received_keys:
+            verified, is_new_key = self.add_key(received_key)
+            key_verified |= verified
+            if verified and is_new_key:
+                self.tags_structure.update_tag_lists()
+
+        return key_verified
+
+    def set_resume_key(self, tesla_key: TESLAKey) -> bool:
+        """Sets a TESLA key of this chain verified in a previous execution as candidate anchor. When a key with the same
+        or higher index is received, it is verified against the candidate, saving the hashes from the KROOT. The
+        candidate becomes the last verified key only if the received key hashes down to it, otherwise it is discarded
+        and the key is verified from the KROOT.
+
+        :param tesla_key: TESLA key with the index and GST_sf set.
+        :type tesla_key: TESLAKey
+        :return: False if the index and GST of the key are not consistent with this chain and the key is not used.
+        :rtype: bool
+        """
+        if (tesla_key.index is None or tesla_key.index <= 0 or tesla_key.index != self.get_key_index(tesla_key.gst_sf)
+                or tesla_key.gst_sf != self._compute_gst_subframe(tesla_key.index)):
+            return False
+        self.resume_tesla_key = tesla_key
+        return True
+
+    def _resume_from_key(self):
+        resume_key = self.resume_tesla_key
+        self.resume_tesla_key = None
+        resume_key.set_verified(True)
+        resume_key.gst_start = resume_key.gst_sf + self.tesla_key_gst_start_offset
+        self.last_tesla_key = resume_key
+        self.checkpoints.add(resume_key)
+        self.key_cache.add(resume_key)
+        logger.info(f"Tesla key {resume_key.index} resumed from the stored key at {resume_key.gst_sf}.\n")
 
     def _get_tesla_key(self, wanted_key_index: int) -> TESLAKey:
         """Retrieves a TESLA key according to the index provided. In the strange case that the key solicited is not the
         last key verified, it is computed. That situation can happen in case of discontinuities in the reception from
-        the satellites.
+        the satellites. The key is computed from the nearest checkpoint above it and stored in the key cache.
 
         :param wanted_key_index: Index of the tesla key to be retrieved
         :type wanted_key_index: int
         """
 
-        return_tesla_key = self.last_tesla_key
-        number_of_hashes = abs(wanted_key_index - self.last_tesla_key.index)
+        if wanted_key_index == self.last_tesla_key.index:
+            return self.last_tesla_key
+        if cached_tesla_key := self.key_cache.get(wanted_key_index):
+            return cached_tesla_key
+
+        return_tesla_key = self.checkpoints.get_above(wanted_key_index) or self.last_tesla_key
+        number_of_hashes = return_tesla_key.index - wanted_key_index
         for _ in range(number_of_hashes):
             return_tesla_key = self._compute_next_key(return_tesla_key)
+            if self.checkpoints.is_sparse_index(return_tesla_key.index):
+                self.checkpoints.add(return_tesla_key)
+        self.key_cache.add(return_tesla_key)
 
         return return_tesla_key
 
@@ -17,7 +17,7 @@
 ######## type annotations ########
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
-    from osnma.input_formats.base_classes import PageIterator, DataFormat
+    from osnma.input_formats.base_classes import PageIterator, DataFormat, PageBatch
 
 ######## imports ########
 from osnma.receiver.satellite import Satellite
@@ -29,15 +29,27 @@ from osnma.cryptographic.gst_class import GST
 from osnma.utils.status_logger import StatusLogger
 from osnma.utils.api_logger import APIBitsLogger
 from osnma.input_formats.base_classes import GAL_BAND
+from osnma.structures.adkd import PAGE_SIZE
+
+from itertools import groupby
 
 ######## logger ########
 import osnma.utils.logger_factory as log_factory
 logger = log_factory.get_logger(__name__)
 
+_ALERT_SHIFT = PAGE_SIZE - 2
+_PAGE_TYPE_SHIFT = PAGE_SIZE - 8
+_DUMMY_PAGE_TYPE = 63
+
 
 class OSNMAReceiver:
 
-    def __init__(self, input_module: 'PageIterator', param_dict: dict):
+    def __init__(self, input_module: 'PageIterator | None', param_dict: dict):
+        """
+        :param input_module: Input module iterated by :meth:`start`. It can be None if the pages are only given with
+            :meth:`process_batch`.
+        :param param_dict: Configuration parameters of the receiver.
+        """
 
         Config.load_configuration_parameters(param_dict)
         logs_path = log_factory.configure_loggers()
@@ -56,6 +68,10 @@ class OSNMAReceiver:
 
         Config.FIRST_GST = None
 
+    @property
+    def input_module_name(self) -> str:
+        return self.nav_data_input.__class__.__name__ if self.nav_data_input is not None else 'PageBatch'
+
     def _is_dummy_page(self, data: 'DataFormat') -> bool:
         return data.nav_bits[2:8].uint == 63
 
@@ -91,12 +107,18 @@ class OSNMAReceiver:
             return False
 
         if self.nav_data_input.provides_independent_clock:
-            Config.TS = data.independent_clock.total_seconds - data.gst_page.total_seconds
+            self._sync_independent_clock(data)
 
         Config.LAST_GST = data.gst_page
 
         return True
 
+    def _sync_independent_clock(self, data: 'DataFormat'):
+        """
+        Updates the time synchronization with the independent clock that received the page.
+        """
+        Config.TS = data.independent_clock.total_seconds - data.gst_page.total_seconds
+
     def _filter_page(self, data: 'DataFormat'):
         """
         Filter page if it is not useful for the current OSNMA implementation.
@@ -132,6 +154,74 @@ class OSNMAReceiver:
 
         return False
 
+    def _filter_batch(self, pages: 'PageBatch') -> list[int]:
+        """
+        Batch version of the page filter and the time synchronization. The filters are evaluated over the columns of the
+        batch and the indexes of the pages to process are returned in order.
+        """
+
+        if len(pages) == 0:
+            return []
+
+        if Config.FIRST_GST is None:
+            Config.FIRST_GST = GST(wn=pages.wn[0], tow=pages.tow[0])
+        first_gst = Config.FIRST_GST.total_seconds
+        valid_bands = (GAL_BAND.E1B, GAL_BAND.E5b) if Config.DO_DUAL_FREQUENCY else (GAL_BAND.E1B,)
+
+        useful = [gst >= first_gst and band in valid_bands and not (bits >> _ALERT_SHIFT) & 1
+                  and (bits >> _PAGE_TYPE_SHIFT) & 0x3F != _DUMMY_PAGE_TYPE
+                  for gst, band, bits in zip(pages.gst_seconds, pages.band, pages.nav_bits)]
+
+        last_gst = Config.LAST_GST.total_seconds if Config.LAST_GST is not None else None
+        selected = []
+        for index in (i for i, is_useful in enumerate(useful) if is_useful):
+            if not pages.crc[index]:
+                logger.warning(f'CRC FAILED\tSVID: {pages.svid[index]:02} - TOW: {pages.tow[index]} - '
+                               f'Page: {(pages.tow[index] % 30):02} - Page NOT processed.')
+                continue
+            if last_gst is not None and pages.gst_seconds[index] < last_gst:
+                logger.error(f"Time is going backwards!")
+                continue
+            last_gst = pages.gst_seconds[index]
+            selected.append(index)
+
+        return selected
+
+    def _process_page(self, page: 'DataFormat', gst_sf: GST):
+        """
+        Load a page that passed the filters into its satellite and the navigation data manager.
+        """
+
+        # Add OSNMA data to satellite
+        satellite = self.satellites[page.svid]
+        satellite.new_page(page)
+
+        # Log satellite
+        StatusLogger.add_satellite(gst_sf, satellite)
+
+        # Add nav data of the page to the navigation data manager
+        self.receiver_state.load_nav_data_page(page)
+
+        # Spread the verification of TESLA keys far from the last verified key over several pages
+        self.receiver_state.continue_tesla_chain_catch_up()
+
+        # Complete a saved HKROOT block with the pages received so far instead of waiting for the end of the subframe
+        if page.has_osnma and Config.DO_HKROOT_REGEN:
+            if regen_block := self.subframe_regenerator.load_dsm_pages(satellite.get_hkroot_subframe(),
+                                                                          self.current_gst_subframe):
+                regen_hkroot_sf, bid = regen_block
+                logger.info(f'HKROOT regenerated. BID {bid}')
+                self.receiver_state.process_hkroot_subframe(regen_hkroot_sf)
+
+        # Add the TESLA key of the satellite to the chain as soon as its pages are received
+        if page.has_osnma and not satellite.tesla_key_processed:
+            self.receiver_state.process_tesla_key_pages(self.current_gst_subframe, satellite, (page.gst_page.tow % 30) // 2)
+
+        # If we get the last subframe page of this satellite, process it now instead of waiting
+        if page.gst_page % 30 == 29:
+            self._end_of_subframe_satellite(self.current_gst_subframe, satellite)
+            satellite.set_already_processed()
+
     def _end_of_subframe_satellite(self, gst_sf: GST, satellite: Satellite):
         """
         Process all the data of satellite at the end of the subframe
@@ -186,6 +276,9 @@ class OSNMAReceiver:
             provided, the TTFAF will be calculated with respect to the first GST read.
         """
 
+        if self.nav_data_input is None:
+            raise ValueError("The receiver has no input module to start from. Use process_batch to give the pages.")
+
         if start_at_gst:
             Config.FIRST_GST = GST(wn=start_at_gst[0], tow=start_at_gst[1])
 
@@ -203,20 +296,50 @@ class OSNMAReceiver:
                     self._end_of_subframe_global()
                     self.current_gst_subframe = gst_sf
 
-                # Add OSNMA data to satellite
-                satellite = self.satellites[page.svid]
-                satellite.new_page(page)
+                self._process_page(page, gst_sf)
 
-                # Log satellite
-                StatusLogger.add_satellite(gst_sf, satellite)
+        except StoppedAtFAF as e:
+            self._do_status_log()
+            return e.ttfaf, e.ttff, e.first_tow, e.faf_tow
+        finally:
+            StatusLogger.close()
+
+    def process_batch(self, pages: 'PageBatch', start_at_gst: tuple[int, int] = None):
+        """
+        Process a batch of pages already in memory, for example an offline replay from pre-decoded arrays. The batch is
+        filtered column wise and grouped by subframe before the surviving pages are loaded in the satellites, which
+        produces the same results as :meth:`start` with the pages in the same order. It can be called several times
+        with consecutive batches of the same replay.
 
-                # Add nav data of the page to the navigation data manager
-                self.receiver_state.load_nav_data_page(page)
+        :param pages: Columnar batch with the pages in reception order.
+        :param start_at_gst: Tuple with (WN, TOWs) telling the receiver when to start to process OSNMA data. If not
+            provided, the TTFAF will be calculated with respect to the first GST of the batch.
+        """
+
+        if start_at_gst:
+            Config.FIRST_GST = GST(wn=start_at_gst[0], tow=start_at_gst[1])
+
+        try:
+            selected = self._filter_batch(pages)
+            if selected and not self.current_gst_subframe:
+                self.current_gst_subframe = GST(wn=pages.wn[selected[0]], tow=pages.tow[selected[0]]).subframe
+
+            subframe_groups = groupby(selected, key=lambda i: pages.gst_seconds[i] - pages.tow[i] % 30)
+            for _, subframe_pages in subframe_groups:
+                subframe_pages = list(subframe_pages)
+                gst_sf = GST(wn=pages.wn[subframe_pages[0]], tow=pages.tow[subframe_pages[0]]).subframe
+
+                # The subframe has finished, process leftovers of OSNMA data and reset objects
+                if gst_sf > self.current_gst_subframe:
+                    self._end_of_subframe_global()
+                    self.current_gst_subframe = gst_sf
 
-                # If we get the last subframe page of this satellite, process it now instead of waiting
-                if page.gst_page % 30 == 29:
-                    self._end_of_subframe_satellite(self.current_gst_subframe, satellite)
-                    satellite.set_already_processed()
+                for index in subframe_pages:
+                    page = pages.get_page(index)
+                    if page.independent_clock is not None:
+                        self._sync_independent_clock(page)
+                    Config.LAST_GST = page.gst_page
+                    self._process_page(page, gst_sf)
 
         except StoppedAtFAF as e:
             self._do_status_log()
@@ -14,6 +14,10 @@
 # See the Licence for the specific language governing permissions and limitations under the Licence.
 #
 
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from osnma.structures.mack_structures import TESLAKey
+
 from bitstring import BitArray
 from osnma.input_formats.base_classes import DataFormat, GAL_BAND
 
@@ -32,6 +36,9 @@ class Satellite:
         self.osnma_subframe: bool = False
         self.active_on_this_subframe: bool = False
         self.already_processed: bool = False
+        self.tesla_key_processed: bool = False
+        self.tesla_key: 'TESLAKey | None' = None
+        """ TESLA key of the subframe added to the chain as soon as its pages were received """
         self.pages_bits_log: dict[GAL_BAND, list[str | None]] = {
             GAL_BAND.E1B: [None for _ in range(15)],
             GAL_BAND.E5b: [None for _ in range(15)]
@@ -48,6 +55,8 @@ class Satellite:
         self.osnma_subframe = False
         self.active_on_this_subframe = False
         self.already_processed = False
+        self.tesla_key_processed = False
+        self.tesla_key = None
         self.pages_bits_log = {
             GAL_BAND.E1B: [None for _ in range(15)],
             GAL_BAND.E5b: [None for _ in range(15)]
@@ -75,6 +84,10 @@ class Satellite:
             self._load_osnma(page, page_number)
         self.pages_bits_log[page.band][page_number] = page.nav_bits.hex
 
+    def set_tesla_key_processed(self, tesla_key: 'TESLAKey | None'):
+        self.tesla_key_processed = True
+        self.tesla_key = tesla_key
+
     def get_mack_subframe(self) -> list[BitArray | None]:
         return self.mack_subframe
 
@@ -16,7 +16,6 @@
 
 ######## imports ########
 from bitstring import BitArray
-from osnma.structures.fields_information import NB_DK_lt, NB_DP_lt
 from osnma.cryptographic.gst_class import GST
 
 ######## logger ########
@@ -25,82 +24,152 @@ logger = log_factory.get_logger(__name__)
 
 # Here due to circular input, to fix when this file is merged with DSM manager
 from osnma.utils.status_logger import StatusLogger
+from osnma.utils.config import Config
 
 NMA_HEADER = 0
 DSM_HEADER = 1
-DSM_NUMBER_OF_BLOCKS_PAGE = 2
-DSM_NUMBER_OF_BLOCKS_FIELD = slice(0, 4)
 DSM_BLOCK_ID = slice(4, 8)
 DSM_ID = slice(0, 4)
+HKROOT_PAGES = 15
+FULL_BLOCK_MASK = (1 << HKROOT_PAGES) - 1
+
+
+def _pages_mask(pages: list[BitArray | None]) -> int:
+    mask = 0
+    for index, page in enumerate(pages):
+        if page is not None:
+            mask |= 1 << index
+    return mask
+
+
+class RegenBlock:
+    """
+    HKROOT pages of a DSM block received on broken subframes. The mask has the bit of each page received set, and the
+    GST is the one of the first subframe with pages of the block.
+    """
+
+    __slots__ = ('pages', 'mask', 'gst')
+
+    def __init__(self, pages: list[BitArray | None], gst: GST):
+        self.pages = list(pages)
+        self.mask = _pages_mask(pages)
+        self.gst = gst
+
+    def merge(self, pages: list[BitArray | None], gst: GST):
+        """
+        Adds the pages missing in the block. If a page received is different from the one saved, the block content has
+        changed and it starts again with the new pages.
+        """
+        for index, page in enumerate(pages):
+            if page is not None and self.mask >> index & 1 and page != self.pages[index]:
+                self.pages = list(pages)
+                self.mask = _pages_mask(pages)
+                self.gst = gst
+                return
+
+        missing = FULL_BLOCK_MASK & ~self.mask
+        for index, page in enumerate(pages):
+            if missing >> index & 1 and page is not None:
+                self.pages[index] = page
+                self.mask |= 1 << index
+
+    def is_complete(self) -> bool:
+        return self.mask == FULL_BLOCK_MASK
+
+    def get_block(self) -> BitArray:
+        return BitArray().join(self.pages)
 
 
 class SubFrameRegenerator:
 
     def __init__(self):
-        self.dsm_id: int | None = None
-        self.bid_ref: int | None = None
-        self.svid_ref: int | None = None
-        self.gst_ref: GST | None = None
-        self.num_blocks: int | None = None
-        self.num_blocks_lookup_table: list[str | int] = []
-        self.block_dict: dict[int, list[BitArray]] = {}
-
-    def _get_dsm_lookup_table(self, dsm_id: int):
-        return NB_DK_lt if dsm_id < 12 else NB_DP_lt
-
-    def _is_block_complete(self, block: list[BitArray]):
-        full_block = BitArray().join([array for array in block if array is not None])
-        return full_block if len(full_block) == 120 else False
-
-    def _save_block(self, new_block: list[BitArray], bid: int):
-        saved_block = self.block_dict.get(bid)
+        self.regen_buffers: dict[int, dict[int, RegenBlock]] = {}
+        """ Blocks of broken subframes by DSM ID and BID, merged across satellites until they are complete """
+        self.last_expiry_gst: GST | None = None
+        self.regenerated_gst = GST()
+        self.regenerated_blocks: set[tuple[int, int]] = set()
+        """ DSM ID and BID of the blocks completed by :meth:`load_dsm_pages` during the subframe regenerated_gst """
+
+    def _is_block_complete(self, block: list[BitArray | None]) -> BitArray | bool:
+        return BitArray().join(block) if _pages_mask(block) == FULL_BLOCK_MASK else False
+
+    def _save_block(self, new_block: list[BitArray | None], dsm_id: int, bid: int, gst_subframe: GST):
+        dsm_buffer = self.regen_buffers.setdefault(dsm_id, {})
+        saved_block = dsm_buffer.get(bid)
         if saved_block is None:
-            self.block_dict[bid] = new_block
+            dsm_buffer[bid] = RegenBlock(new_block, gst_subframe)
         else:
-            for index, (new_page, saved_page) in enumerate(zip(new_block, saved_block)):
-                if saved_page is None and new_page is not None:
-                    saved_block[index] = new_page
-
-    def _update_references(self, dsm_id, block_id, gst_subframe: GST, svid):
-        self.dsm_id = dsm_id
-        self.bid_ref = block_id
-        self.svid_ref = svid
-        self.gst_ref = gst_subframe
-        self.num_blocks_lookup_table = self._get_dsm_lookup_table(dsm_id)
-        self.num_blocks = None
-        self.block_dict = {}
+            saved_block.merge(new_block, gst_subframe)
+
+    def _expire_blocks(self, gst_subframe: GST):
+        """
+        Drops the blocks not updated in the last Config.HKROOT_REGEN_MAX_AGE seconds, once per subframe.
+        """
+        if self.last_expiry_gst is not None and gst_subframe.total_seconds <= self.last_expiry_gst.total_seconds:
+            return
+        self.last_expiry_gst = gst_subframe
+
+        horizon = gst_subframe.total_seconds - Config.HKROOT_REGEN_MAX_AGE
+        for dsm_id, dsm_buffer in list(self.regen_buffers.items()):
+            for bid in [bid for bid, block in dsm_buffer.items() if block.gst.total_seconds < horizon]:
+                dsm_buffer.pop(bid)
+            if not dsm_buffer:
+                self.regen_buffers.pop(dsm_id)
 
     def get_regenerated_blocks(self) -> list[tuple[BitArray, int]]:
         complete_blocks = []
-        for bid, block in dict(self.block_dict).items():
-            if full_block := self._is_block_complete(block):
-                complete_blocks.append((full_block, bid))
-                self.block_dict.pop(bid)
+        for dsm_buffer in self.regen_buffers.values():
+            for bid, block in list(dsm_buffer.items()):
+                if block.is_complete():
+                    complete_blocks.append((block.get_block(), bid))
+                    dsm_buffer.pop(bid)
         return complete_blocks
 
+    def load_dsm_pages(self, hkroot_subframe: list[BitArray | None], gst_subframe: GST) -> tuple[BitArray, int] | None:
+        """
+        Merges the HKROOT pages received so far on a satellite subframe with the saved incomplete block of the same DSM
+        ID and BID. Returns the block and its BID if the pages completed it before the end of the subframe. The pages of
+        that block received on this subframe are not saved again at the end of the subframe.
+        """
+        if (dsm_header := hkroot_subframe[DSM_HEADER]) is None:
+            return None
+        dsm_id = dsm_header[DSM_ID].uint
+        dsm_buffer = self.regen_buffers.get(dsm_id)
+        bid = dsm_header[DSM_BLOCK_ID].uint
+        if dsm_buffer is None or (saved_block := dsm_buffer.get(bid)) is None or self._is_block_complete(hkroot_subframe):
+            # Nothing to regenerate, or the subframe alone is complete and processed at the end of the subframe
+            return None
+
+        saved_block.merge(hkroot_subframe, gst_subframe)
+        if saved_block.is_complete():
+            dsm_buffer.pop(bid)
+            if gst_subframe != self.regenerated_gst:
+                self.regenerated_gst = gst_subframe
+                self.regenerated_blocks.clear()
+            self.regenerated_blocks.add((dsm_id, bid))
+            return saved_block.get_block(), bid
+        return None
+
+    def _is_regenerated(self, dsm_id: int, bid: int, gst_subframe: GST) -> bool:
+        return gst_subframe == self.regenerated_gst and (dsm_id, bid) in self.regenerated_blocks
+
     def load_dsm_block(self, hkroot_subframe: list[BitArray | None], gst_subframe: GST, svid: int) \
             -> tuple[BitArray | bool, BitArray | None]:
 
+        self._expire_blocks(gst_subframe)
+
         block_id: int | None = None
+        dsm_id: int | None = None
         # Get block_id from DSM Header
         if hkroot_subframe[DSM_HEADER] is not None:
             block_id = hkroot_subframe[DSM_HEADER][DSM_BLOCK_ID].uint
             dsm_id = hkroot_subframe[DSM_HEADER][DSM_ID].uint
-            if dsm_id != self.dsm_id:
-                self._update_references(dsm_id, block_id, gst_subframe, svid)
         # Get block_id from inferring
         # TODO
 
-        # Get the number of blocks for the DSM message if the block id is 0 and it has the third page
-        # TODO: do it after reconstructing
-        if block_id == 0 and hkroot_subframe[DSM_NUMBER_OF_BLOCKS_PAGE] is not None:
-            #logger.warning(hkroot_subframe)
-            raw_number_of_blocs = hkroot_subframe[DSM_NUMBER_OF_BLOCKS_PAGE][DSM_NUMBER_OF_BLOCKS_FIELD].uint
-            self.num_blocks = self.num_blocks_lookup_table[raw_number_of_blocs]
-
         complete_block = self._is_block_complete(hkroot_subframe)
-        if not complete_block and block_id is not None:
-            self._save_block(hkroot_subframe, block_id)
+        if not complete_block and block_id is not None and not self._is_regenerated(dsm_id, block_id, gst_subframe):
+            self._save_block(hkroot_subframe, dsm_id, block_id, gst_subframe)
 
         # Get NMA Status
         nma_status = None
@@ -92,3 +92,73 @@ adkd_masks = [
     None,
     None
 ]
+
+PAGE_SIZE = 240
+"""Size of a nominal I/NAV page with the even and odd parts concatenated"""
+WORD_SIZE = 128
+"""Size of an I/NAV word: 112 bits of the even page data plus 16 bits of the odd page data"""
+
+_WORD_EVEN_SHIFT = PAGE_SIZE - 114
+_WORD_EVEN_MASK = (1 << 112) - 1
+_WORD_ODD_SHIFT = PAGE_SIZE - 138
+_WORD_ODD_MASK = (1 << 16) - 1
+
+_WORD_TYPE_SHIFT = WORD_SIZE - 6
+_WORD_TYPE_MASK = (1 << 6) - 1
+_IOD_SHIFT = WORD_SIZE - 16
+_IOD_MASK = (1 << 10) - 1
+IOD_SIZE = 10
+
+
+def get_word_from_page(page: int) -> int:
+    """
+    Extracts the 128 bits I/NAV word from a 240 bits page stored as integer: page[2:114] + page[122:138].
+    """
+    return (((page >> _WORD_EVEN_SHIFT) & _WORD_EVEN_MASK) << 16) | ((page >> _WORD_ODD_SHIFT) & _WORD_ODD_MASK)
+
+
+def get_word_type(word: int) -> int:
+    return (word >> _WORD_TYPE_SHIFT) & _WORD_TYPE_MASK
+
+
+def get_word_iod(word: int) -> int:
+    """
+    IOD of the word, only meaningful for the CED words 1 to 4 (bits 6 to 16 of the word).
+    """
+    return (word >> _IOD_SHIFT) & _IOD_MASK
+
+
+def _compile_word_layout(masks: list[dict | None]) -> list[dict[int, tuple[int, int, int]] | None]:
+    """
+    Converts the bit slices of `adkd_masks` to (shift, mask, size) tuples that extract the ADKD data of a word stored
+    as integer with a shift and an and operation.
+    """
+    word_layout = []
+    for adkd_mask in masks:
+        if adkd_mask is None:
+            word_layout.append(None)
+            continue
+        adkd_layout = {}
+        for word_type, word_mask in adkd_mask['adkd'].items():
+            start, end = word_mask['bits']
+            size = end - start
+            adkd_layout[word_type] = (WORD_SIZE - end, (1 << size) - 1, size)
+        word_layout.append(adkd_layout)
+    return word_layout
+
+
+adkd_word_layout = _compile_word_layout(adkd_masks)
+"""Per ADKD and word type, the (shift, mask, size) to extract the ADKD data from a word stored as integer"""
+
+
+def get_adkd_data_from_word(adkd: int, word_type: int, word: int) -> int:
+    shift, mask, _ = adkd_word_layout[adkd][word_type]
+    return (word >> shift) & mask
+
+
+def pack_bits(value: int, size: int) -> bytes:
+    """
+    Packs a `size` bits integer MSB first into bytes, padding the last byte with zeros as `BitArray.tobytes` does.
+    """
+    padding = -size % 8
+    return (value << padding).to_bytes((size + padding) // 8, 'big')
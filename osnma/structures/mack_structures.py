@@ -20,8 +20,36 @@ if TYPE_CHECKING:
     from osnma.osnma_core.nav_data_manager import ADKD0DataBlock, ADKD4DataBlock
 
 ######## imports ########
-from osnma.cryptographic.gst_class import GST
-from bitstring import BitArray
+from osnma.cryptographic.gst_class import GST, LEN_GST
+from osnma.structures.adkd import pack_bits
+from osnma.structures.fields_information import field_info
+from bitstring import BitArray, Bits
+
+
+PRN_SIZE = 8
+ADKD_SIZE = 4
+COP_SIZE = 4
+CTR_SIZE = 8
+NMAS_SIZE = 2
+FLX_INFO_SIZE = PRN_SIZE + ADKD_SIZE + COP_SIZE
+MACSEQ_SIZE = field_info['MACSEQ']['size']
+TAG_HEADER_SIZE = 2*PRN_SIZE + LEN_GST + CTR_SIZE + NMAS_SIZE
+TAG0_HEADER_SIZE = PRN_SIZE + LEN_GST + CTR_SIZE + NMAS_SIZE
+
+
+def pack_auth_data(header: int, header_size: int, data_value: int, data_size: int) -> bytes:
+    """
+    Packs the MAC input (header || data) into bytes. The data is not byte aligned with the header, so it is shifted
+    as an integer instead of appending bits. The last byte is padded with zeros as `BitArray.tobytes` does.
+    """
+    return pack_bits(header << data_size | data_value, header_size + data_size)
+
+
+def truncate_mac(mac: bytes, size: int) -> int:
+    """
+    Returns the `size` most significant bits of the MAC as an integer.
+    """
+    return int.from_bytes(mac[:-(-size // 8)], 'big') >> (-size % 8)
 
 
 class TESLAKey:
@@ -29,18 +57,20 @@ class TESLAKey:
     when the TESLA Chain is created.
     """
 
-    def __init__(self, gst_sf: GST, key: BitArray | str | bytes,
+    __slots__ = ('verified', 'key', 'reconstructed', 'is_kroot', 'index', 'svid', 'gst_sf', 'gst_start')
+
+    def __init__(self, gst_sf: GST, key: bytes | BitArray | str,
                  svid: int = None, index: int = None, gst_start: GST = GST(), reconstructed: bool = False, is_kroot: bool = False):
         """Instantiates the TESLAKey object. If the Telsa Key is_kroot, index and svid are set to 0.
 
         :param gst_sf: GST at the start of the Galileo subframe where the TESLA key is received.
-        :param key: Value of the TESLA key received.
+        :param key: Value of the TESLA key received. Stored as bytes, the key sizes are always a multiple of 8 bits.
         :param svid: Satellite number (NS). Value between 1 and 36. Set to 0 for KROOT.
         :param is_kroot: If this Tesla Key comes from an HKROOT message.
         :param index: Index of the key if it is known. Set to 0 for KROOT.
         """
         self.verified: bool = False
-        self.key = BitArray(key)
+        self.key: bytes = key if isinstance(key, bytes) else Bits(key).tobytes()
         self.reconstructed = reconstructed
 
         self.is_kroot = is_kroot
@@ -55,7 +85,7 @@ class TESLAKey:
         self.gst_start: GST = gst_start
 
     def get_json(self) -> dict:
-        return {'Value': self.key.hex, 'Verified': self.verified, 'Reconstructed': self.reconstructed}
+        return {'Value': self.key.hex(), 'Verified': self.verified, 'Reconstructed': self.reconstructed}
 
     def set_gst(self, gst_sf: GST):
         """Set the GST at the start of the Galileo Subframe where the key is received.
@@ -107,7 +137,9 @@ class TESLAKey:
 
 class MACSeqObject:
 
-    def __init__(self, gst: GST, svid: BitArray, macseq_value: BitArray, flex_list: list['TagAndInfo'] = None, key_id: int = None):
+    __slots__ = ('gst', 'svid', 'macseq_value', 'flex_list', 'key_id', 'tesla_key', 'is_verified')
+
+    def __init__(self, gst: GST, svid: int, macseq_value: int, flex_list: list['TagAndInfo'] = None, key_id: int = None):
         self.gst = gst
         self.svid = svid
         self.macseq_value = macseq_value
@@ -117,16 +149,15 @@ class MACSeqObject:
         self.is_verified: bool = False
 
     def _get_macseq_auth_data(self):
-        auth_data = self.svid + self.gst.bitarray
+        auth_data = self.svid << LEN_GST | self.gst.int
         for tag in self.flex_list:
-            auth_data.append(tag.prn_d + tag.adkd + tag.cop)
-        return auth_data
+            auth_data = auth_data << FLX_INFO_SIZE | (tag.prn_d << ADKD_SIZE | tag.adkd) << COP_SIZE | tag.cop
+        return pack_bits(auth_data, PRN_SIZE + LEN_GST + FLX_INFO_SIZE * len(self.flex_list))
 
     def authenticate(self, mac_function) -> bool:
         auth_data = self._get_macseq_auth_data()
         computed_macseq_tag = mac_function(self.tesla_key.key, auth_data)
-        computed_macseq_tag_short = computed_macseq_tag[:len(self.macseq_value)]
-        self.is_verified = self.macseq_value == computed_macseq_tag_short
+        self.is_verified = self.macseq_value == truncate_mac(computed_macseq_tag, MACSEQ_SIZE)
         return self.is_verified
 
     @property
@@ -134,14 +165,21 @@ class MACSeqObject:
         return self.tesla_key is not None
 
     def get_log(self) -> str:
-        return f"PRN_A: {self.svid.uint:02} GST_SF: {self.gst} FLX Tags: {len(self.flex_list)}"
+        return f"PRN_A: {self.svid:02} GST_SF: {self.gst} FLX Tags: {len(self.flex_list)}"
 
 
 class TagAndInfo:
+    """Tag with its info field. The tag value and the small fields (PRN_D, PRN_A, ADKD, COP and NMA Status) are stored
+    as integers, the bit encoding is only generated when building the MAC input.
+    """
+
+    __slots__ = ('tag_value', 'tag_size', 'prn_d', 'prn_a', 'adkd', 'cop', 'ctr', 'gst_subframe', 'nma_status', 'id', 'is_dummy',
+                 'is_verified', 'key_id', 'tesla_key', 'is_tag0', 'is_flx', 'nav_data')
 
-    def __init__(self, tag_value: BitArray, prn_d: BitArray, adkd: BitArray, cop: BitArray, gst_subframe: GST,
-                 prn_a: BitArray, ctr: int, nma_status: BitArray):
+    def __init__(self, tag_value: int, tag_size: int, prn_d: int, adkd: int, cop: int, gst_subframe: GST,
+                 prn_a: int, ctr: int, nma_status: int):
         self.tag_value = tag_value
+        self.tag_size = tag_size
         self.prn_d = prn_d
         self.prn_a = prn_a
         self.adkd = adkd
@@ -149,8 +187,8 @@ class TagAndInfo:
         self.ctr = ctr
         self.gst_subframe = gst_subframe
         self.nma_status = nma_status
-        self.id = (self.prn_d.uint, self.adkd.uint)
-        self.is_dummy = (self.cop.uint == 0)
+        self.id = (self.prn_d, self.adkd)
+        self.is_dummy = (self.cop == 0)
         self.is_verified: bool = False
         self.key_id: int | None = None
         self.tesla_key: TESLAKey | None = None
@@ -159,10 +197,10 @@ class TagAndInfo:
         self.nav_data: 'ADKD0DataBlock | ADKD4DataBlock | None' = None
 
     def __repr__(self) -> str:
-        return f"{{ID: ({self.id[0]:02}, {self.id[1]:02}, {self.cop.uint:02}) PRN_A: {self.prn_a.uint:02}}}"
+        return f"{{ID: ({self.id[0]:02}, {self.id[1]:02}, {self.cop:02}) PRN_A: {self.prn_a:02}}}"
 
     def get_json(self) -> list:
-        id = [self.id[0], self.id[1], self.cop.uint]
+        id = [self.id[0], self.id[1], self.cop]
         if self.is_flx:
             id.append('FLX')
         return id
@@ -173,50 +211,55 @@ class TagAndInfo:
 
     @property
     def data_id(self):
-        return self.adkd.uint, self.prn_d.uint, self.nav_data.nav_data_stream.tobytes()
-
-    def _get_tag_auth_data(self):
-        auth_data = self.prn_d + self.prn_a + self.gst_subframe.bitarray + BitArray(uint=self.ctr, length=8) + self.nma_status + self.nav_data.nav_data_stream
-        return auth_data
-
-    def authenticate(self, mac_function) -> bool:
+        return self.adkd, self.prn_d, self.nav_data.nav_data_digest
 
-        auth_data = self._get_tag_auth_data()
-        computed_tag = mac_function(self.tesla_key.key, auth_data)
-        computed_tag_short = computed_tag[:len(self.tag_value)]
+    def get_auth_data(self) -> bytes:
+        auth_header = ((self.prn_d << PRN_SIZE | self.prn_a) << LEN_GST | self.gst_subframe.int) << CTR_SIZE | self.ctr
+        auth_header = auth_header << NMAS_SIZE | self.nma_status
+        return pack_auth_data(auth_header, TAG_HEADER_SIZE, self.nav_data.nav_data_value, self.nav_data.nav_data_len)
 
-        if computed_tag_short == self.tag_value:
+    def check_mac(self, computed_tag: bytes) -> bool:
+        """Compares the tag with the MAC computed over its authentication data and updates the verification status."""
+        if truncate_mac(computed_tag, self.tag_size) == self.tag_value:
             self.is_verified = True
-            if not self.is_dummy and self.adkd.uint == 0:
-                self.nav_data.last_cop = self.cop.uint
+            if not self.is_dummy and self.adkd == 0:
+                self.nav_data.last_cop = self.cop
                 self.nav_data.last_cop_gst = self.gst_subframe
 
         return self.is_verified
 
+    def authenticate(self, mac_function) -> bool:
+        return self.check_mac(mac_function(self.tesla_key.key, self.get_auth_data()))
+
     def get_log(self) -> str:
-        return f"({self.id[0]:02}, {self.id[1]:02}) PRN_A: {self.prn_a.uint:02} GST_SF: {self.gst_subframe} COP: {self.cop.uint:02}"
+        return f"({self.id[0]:02}, {self.id[1]:02}) PRN_A: {self.prn_a:02} GST_SF: {self.gst_subframe} COP: {self.cop:02}"
 
 
 class Tag0AndSeq(TagAndInfo):
 
-    def __init__(self, tag0_value: BitArray, prn_a: BitArray, iod_tag: BitArray, gst_subframe: GST, mac_seq: BitArray,
-                 nma_status: BitArray):
-        prn_d = prn_a  # PRN_D used to compute the id as bitarray
-        adkd = BitArray('0x0')  # TAG0 has adkd 0
-        super().__init__(tag0_value, prn_d, adkd, iod_tag, gst_subframe, prn_a, 1, nma_status)
+    __slots__ = ('mac_seq',)
+
+    def __init__(self, tag0_value: int, tag_size: int, prn_a: int, iod_tag: int, gst_subframe: GST, mac_seq: int,
+                 nma_status: int):
+        prn_d = prn_a  # PRN_D used to compute the id
+        adkd = 0  # TAG0 has adkd 0
+        super().__init__(tag0_value, tag_size, prn_d, adkd, iod_tag, gst_subframe, prn_a, 1, nma_status)
         self.mac_seq = mac_seq
         self.is_tag0 = True
 
     def get_log(self) -> str:
         return f"{super().get_log()} TAG0"
 
-    def _get_tag_auth_data(self):
-        auth_data = self.prn_a + self.gst_subframe.bitarray + BitArray(uint=self.ctr, length=8) + self.nma_status + self.nav_data.nav_data_stream
-        return auth_data
+    def get_auth_data(self) -> bytes:
+        auth_header = ((self.prn_a << LEN_GST | self.gst_subframe.int) << CTR_SIZE | self.ctr) << NMAS_SIZE | self.nma_status
+        return pack_auth_data(auth_header, TAG0_HEADER_SIZE, self.nav_data.nav_data_value, self.nav_data.nav_data_len)
+
 
 class MACKMessage:
 
-    def __init__(self, gst_sf: GST, chain_id: int, svid: BitArray, nr_tags: int, tags: list[TagAndInfo] = None, tesla_key: TESLAKey = None):
+    __slots__ = ('svid', 'gst_sf', 'chain_id', 'nr_tags', 'tesla_key', 'tags', 'tag0_and_seq', 'macseq')
+
+    def __init__(self, gst_sf: GST, chain_id: int, svid: int, nr_tags: int, tags: list[TagAndInfo] = None, tesla_key: TESLAKey = None):
 
         self.svid = svid
         self.gst_sf = gst_sf
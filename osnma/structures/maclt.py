@@ -14,6 +14,9 @@
 # See the Licence for the specific language governing permissions and limitations under the Licence.
 #
 
+######## imports ########
+from typing import Callable
+
 mac_lookup_table = [
     {
         'ID': 0,
@@ -301,3 +304,40 @@ mac_lookup_table = [
         'sequence': [['00S', 'FLX', '04S', 'FLX'], ['00S', 'FLX', 'FLX', '12S']]
     },
 ]
+
+
+def _self_auth_prn(prn_a: int, prn_d: int) -> bool:
+    return prn_d == prn_a or prn_d == 255
+
+
+def _cross_auth_prn(prn_a: int, prn_d: int) -> bool:
+    return 1 <= prn_d <= 36 or prn_d == 255
+
+
+def _group_prn(prn_a: int, prn_d: int) -> bool:
+    return 64 <= prn_d < 96
+
+
+_slot_type_prn_predicates = {'S': _self_auth_prn, 'E': _cross_auth_prn, 'G': _group_prn}
+
+
+def compile_maclt_slot(slot: str) -> tuple[int | None, Callable[[int, int], bool] | None, bool, str]:
+    """
+    Compiles a MACLT slot string as (ADKD, allowed PRN_D predicate, is FLX, slot string). The predicate is called
+    with the PRN_A and PRN_D of the tag. FLX slots have no ADKD nor predicate.
+    """
+    if slot == 'FLX':
+        return None, None, True, slot
+    return int(slot[:2]), _slot_type_prn_predicates[slot[2]], False, slot
+
+
+def compile_maclt(maclt: int) -> tuple[tuple[tuple, ...], ...] | None:
+    """
+    Compiles the sequence of the MACLT entry as a tuple with the compiled slots of each section. Returns None for
+    reserved entries and for entries with more than one MACK block, not supported with the current ICD.
+    """
+    maclt_dict = mac_lookup_table[maclt] if maclt < len(mac_lookup_table) else None
+    if maclt_dict is None or maclt_dict['NMACK'] != 1:
+        return None
+    sequences = [maclt_dict['sequence']] if maclt_dict['sections'] == 1 else maclt_dict['sequence']
+    return tuple(tuple(compile_maclt_slot(slot) for slot in sequence) for sequence in sequences)
@@ -28,6 +28,8 @@ class _Config:
         self.MERKLE_NAME = 'OSNMA_MerkleTree.xml'
         self.PUBK_NAME = ''
         self.KROOT_NAME = ''
+        self.TESLA_KEY_NAME = 'OSNMA_last_TESLA_key.txt'
+        self.MACK_BACKLOG_NAME = 'OSNMA_MACK_backlog.txt'
         self.NEW_MERKLE_NAME = 'new_OSNMA_MerkleTree.xml'
 
         self.FILE_LOG_LEVEL = logging.INFO
@@ -57,6 +59,22 @@ class _Config:
         self.DO_DUAL_FREQUENCY = False
         self.STOP_AT_FAF = False
 
+        self.TESLA_KEY_CACHE_SIZE = 64
+        self.TESLA_KEY_CACHE_MAX_AGE = 3600
+        self.TESLA_KEY_CHECKPOINT_INTERVAL = 64
+        self.TESLA_KEY_RECENT_CHECKPOINTS = 16
+        self.DO_TESLA_KEY_STORE = False
+        self.TESLA_KEY_STORE_INTERVAL = 300
+        self.TESLA_CATCH_UP_BUDGET = 0
+        self.PENDING_TAGS_TTL = 172800
+        self.PENDING_TAGS_MAX = 5000
+        self.AUTHENTICATED_DATA_PER_SATELLITE = 16
+        self.AUTHENTICATED_DATA_TAG_WINDOW = 330
+        self.MACK_BACKLOG_HORIZON = 3600
+        self.DO_MACK_BACKLOG_SPILL = False
+        self.MACK_BACKLOG_MEMORY_SIZE = 720
+        self.HKROOT_REGEN_MAX_AGE = 3600
+
         self.FIRST_GST = None
         self.LAST_GST = None
 
@@ -25,6 +25,8 @@ from bitstring import BitArray
 
 from osnma.cryptographic.dsm_pkr import DSMPKR
 from osnma.cryptographic.dsm_kroot import DSMKroot
+from osnma.cryptographic.gst_class import GST
+from osnma.structures.mack_structures import TESLAKey
 
 ######## logger ########
 import osnma.utils.logger_factory as logger_factory
@@ -123,3 +125,53 @@ class IOHandler:
                 kroot_file.write(nmah_bits.hex)
             except IOError:
                 logger.error(f'Error saving Key Root to file.')
+
+    def read_tesla_key(self, file_name='OSNMA_last_TESLA_key.txt') -> tuple[bytes, int, TESLAKey]:
+        try:
+            with open(self.path/file_name, 'r') as tesla_key_file:
+                kroot = bytes.fromhex(tesla_key_file.readline().strip())
+                chain_id, index, wn, tow = [int(value) for value in tesla_key_file.readline().split()]
+                key = bytes.fromhex(tesla_key_file.readline().strip())
+                if not kroot or not key:
+                    raise IOError("Missing lines on TESLA key file.")
+        except (IOError, ValueError) as e:
+            raise IOError(f"IOError while reading the TESLA key file {self.path / file_name}. TESLA key not used.\n\t{e}")
+        return kroot, chain_id, TESLAKey(GST(wn=wn, tow=tow), key, index=index)
+
+    def store_tesla_key(self, kroot: bytes, chain_id: int, tesla_key: TESLAKey, file_name='OSNMA_last_TESLA_key.txt'):
+
+        if not tesla_key.is_verified():
+            raise Exception(f'Saving a TESLA key that has not been verified.')
+
+        try:
+            with open(self.path / file_name, 'w') as tesla_key_file:
+                tesla_key_file.write(kroot.hex()+'\n')
+                tesla_key_file.write(f"{chain_id} {tesla_key.index} {tesla_key.gst_sf.wn} {tesla_key.gst_sf.tow}\n")
+                tesla_key_file.write(tesla_key.key.hex())
+        except IOError:
+            logger.error(f'Error saving TESLA key to file.')
+
+    def append_mack_subframes(self, mack_subframes: list[tuple[list[BitArray | None], GST, int, BitArray]],
+                              file_name='OSNMA_MACK_backlog.txt'):
+        """
+        Appends MACK subframes waiting for a KROOT to the backlog file, one per line: GST, SVID, NMA Status and the
+        MACK bits of each page in hexadecimal, with a dash for the missing pages.
+        """
+        with open(self.path / file_name, 'a') as backlog_file:
+            for mack_subframe, gst_subframe, svid, nma_status in mack_subframes:
+                pages = ','.join('-' if page is None else page.hex for page in mack_subframe)
+                backlog_file.write(f"{gst_subframe.wn} {gst_subframe.tow} {svid} {nma_status.uint} {pages}\n")
+
+    def read_mack_subframes(self, file_name='OSNMA_MACK_backlog.txt') \
+            -> list[tuple[list[BitArray | None], GST, int, BitArray]]:
+        mack_subframes = []
+        with open(self.path / file_name, 'r') as backlog_file:
+            for line in backlog_file:
+                wn, tow, svid, nma_status, pages = line.split()
+                mack_subframe = [None if page == '-' else BitArray(hex=page) for page in pages.split(',')]
+                mack_subframes.append((mack_subframe, GST(wn=int(wn), tow=int(tow)), int(svid),
+                                       BitArray(uint=int(nma_status), length=2)))
+        return mack_subframes
+
+    def remove_file(self, file_name: str):
+        (self.path / file_name).unlink(missing_ok=True)
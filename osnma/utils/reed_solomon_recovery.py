@@ -18,6 +18,7 @@ import reedsolo
 from bitstring import BitArray
 
 from osnma.utils.config import Config
+from osnma.structures.adkd import WORD_SIZE, get_word_iod
 from osnma.cryptographic.gst_class import GST
 from osnma.utils.exceptions import ReedSolomonRecoveryError
 
@@ -41,19 +42,19 @@ class ReedSolomonSatellite:
     def __init__(self, svid: int):
         self.svid: int = svid
         self.last_update_gst: GST = GST(wn=0, tow=0)
-        self.full_iod: BitArray | None = None
-        self.iod_2_lsb: BitArray | None = None
-        self.ced_words: list[BitArray | None] = [None, None, None, None]
-        self.rs_ced_words: list[BitArray | None] = [None, None, None, None]
+        self.full_iod: int | None = None
+        self.iod_2_lsb: int | None = None
+        self.ced_words: list[int | None] = [None, None, None, None]
+        self.rs_ced_words: list[int | None] = [None, None, None, None]
 
-    def _reset_decoding_buffer(self, full_iod: BitArray = None, iod_2_lsb: BitArray = None):
+    def _reset_decoding_buffer(self, full_iod: int = None, iod_2_lsb: int = None):
         """
         Reset decoding buffer of CED and RS CED words. Add the new iod or only the 2 LSB.
         """
-        if full_iod:
+        if full_iod is not None:
             self.full_iod = full_iod
-            self.iod_2_lsb = full_iod[-2:]
-        elif iod_2_lsb:
+            self.iod_2_lsb = full_iod & 0b11
+        elif iod_2_lsb is not None:
             self.full_iod = None
             self.iod_2_lsb = iod_2_lsb
         else:
@@ -72,14 +73,16 @@ class ReedSolomonSatellite:
         info_vector = BitArray(58 * 8)
         # Word Type 1
         if self.ced_words[0] is not None:
-            info_vector[0:WT1_CED_SIZE] = self.ced_words[0]
-            info_vector[6:8] = self.ced_words[0][14:16]
-            info_vector[8:16] = self.ced_words[0][6:14]
+            wt1 = BitArray(uint=self.ced_words[0], length=WORD_SIZE)
+            info_vector[0:WT1_CED_SIZE] = wt1
+            info_vector[6:8] = wt1[14:16]
+            info_vector[8:16] = wt1[6:14]
         else:
-            info_vector[:8] = BitArray('0b000001') + self.iod_2_lsb
+            info_vector[:8] = BitArray('0b000001') + BitArray(uint=self.iod_2_lsb, length=2)
         # Word Types 2, 3, and 4
         for i, word in enumerate(self.ced_words[1:]):
             if word is not None:
+                word = BitArray(uint=word, length=WORD_SIZE)
                 info_vector[WT1_CED_SIZE+CED_SIZE*i:WT1_CED_SIZE+CED_SIZE*(i+1)] = word[16:128]
         return info_vector.bytes
 
@@ -91,6 +94,7 @@ class ReedSolomonSatellite:
         parity_vector = BitArray(60 * 8)
         for i, word in enumerate(self.rs_ced_words):
             if word is not None:
+                word = BitArray(uint=word, length=WORD_SIZE)
                 parity_vector[RS_CED_SIZE*i:(RS_CED_SIZE*i)+8] = word[6:14]
                 parity_vector[(RS_CED_SIZE*i)+8:RS_CED_SIZE*(i+1)] = word[16:128]
         return parity_vector.bytes
@@ -128,7 +132,7 @@ class ReedSolomonSatellite:
         fixed_erasures = [57 - i if i <= 57 else 117 - i + 58 for i in erasures]
         return fixed_erasures
 
-    def _extract_ced_words_and_iod(self, decoded_info_vector: bytes) -> tuple[list[BitArray], BitArray, BitArray]:
+    def _extract_ced_words_and_iod(self, decoded_info_vector: bytes) -> tuple[list[int], int, int]:
         """
         Convert the output of the Reed Solomon information vector decoding to proper CED Galileo words.
         That is mainly adding the word type and iod at the beginning, with some special cases for WT1.
@@ -142,28 +146,29 @@ class ReedSolomonSatellite:
         wt1[6:16] = iod
 
         # Regenerate WT 2, 3, and 4
-        ced_words = [wt1]
+        ced_words = [wt1.uint]
         for i in range(3):
             extracted_word = info_vector[WT1_CED_SIZE + CED_SIZE*i:WT1_CED_SIZE + CED_SIZE*(i+1)]
             ced_word = BitArray(uint=i+2, length=6) + iod + extracted_word
-            ced_words.append(ced_word)
+            ced_words.append(ced_word.uint)
 
-        return ced_words, iod, iod_2_lsb
+        return ced_words, iod.uint, iod_2_lsb.uint
 
-    def _extract_rs_ced_words(self, decoded_parity_vector: bytes, iod_2_lsb: BitArray) -> list[BitArray]:
+    def _extract_rs_ced_words(self, decoded_parity_vector: bytes, iod_2_lsb: int) -> list[int]:
         """
         Convert the output of the Reed Solomon parity vector decoding to proper RS CED Galileo words.
         They are not used for navigation, but useful for sanity checks.
         """
         parity_vector = BitArray(decoded_parity_vector)
+        iod_2_lsb = BitArray(uint=iod_2_lsb, length=2)
         rs_ced_words = []
         for i in range(4):
             extracted_word = parity_vector[RS_CED_SIZE*i:RS_CED_SIZE*(i+1)]
             rs_ced_word = BitArray(uint=i+17, length=6) + extracted_word[:8] + iod_2_lsb + extracted_word[8:]
-            rs_ced_words.append(rs_ced_word)
+            rs_ced_words.append(rs_ced_word.uint)
         return rs_ced_words
 
-    def _extract_and_update_words(self, decoded_msgecc_gal: bytes) -> dict[int, BitArray]:
+    def _extract_and_update_words(self, decoded_msgecc_gal: bytes) -> dict[int, int]:
         """
         Regenerate proper Galileo words from the RS decoding output, update the IOD, perform several sanity checks, and
         decide which CED words to return.
@@ -196,7 +201,7 @@ class ReedSolomonSatellite:
 
         return return_ced_words
 
-    def _decode_rs_message(self) -> dict[int, BitArray]:
+    def _decode_rs_message(self) -> dict[int, int]:
         """
         Generate the code vector (information and parity vectors), calculate the erasure positions, adapt both for the
         RS library format, and perform the RS decoding. Then, extract the recovered CED words from the information
@@ -221,9 +226,10 @@ class ReedSolomonSatellite:
         return_ced_words = self._extract_and_update_words(decoded_msgecc_gal)
         return return_ced_words
 
-    def add_word(self, wt: int, word: BitArray, gst: GST):
+    def add_word(self, wt: int, word: int, gst: GST):
         """
         Add a new word to the buffer. Check the IOD to determine if the decoding buffer should be reset.
+        The word is the 128 bits I/NAV word as integer.
         """
         # Avoid collision on the iod value, reset the buffers after 30 minutes of not seeing the satellite
         if gst > self.last_update_gst + 1800:
@@ -231,8 +237,8 @@ class ReedSolomonSatellite:
         self.last_update_gst = gst
 
         if wt in CED_WORDS:
-            full_iod = word[6:16]
-            iod_2_lsb = full_iod[-2:]
+            full_iod = get_word_iod(word)
+            iod_2_lsb = full_iod & 0b11
             if (self.full_iod is not None and self.full_iod != full_iod) or \
                     self.iod_2_lsb != iod_2_lsb:
                 self._reset_decoding_buffer(full_iod=full_iod)
@@ -240,12 +246,12 @@ class ReedSolomonSatellite:
                 self.full_iod = full_iod
             self.ced_words[wt-1] = word
         elif wt in RS_CED_WORDS:
-            iod_2_lsb = word[14:16]
+            iod_2_lsb = get_word_iod(word) & 0b11
             if self.iod_2_lsb != iod_2_lsb:
                 self._reset_decoding_buffer(iod_2_lsb=iod_2_lsb)
             self.rs_ced_words[wt-17] = word
 
-    def recover_words(self) -> dict[int, BitArray]:
+    def recover_words(self) -> dict[int, int]:
         """
         Returns the recovered CED words if there are at least 4 pages in total and any CED words are missing.
         Else, return an empty dictionary. May raise `ReedSolomonRecoveryError` if any of the inconsistency checks fail.
@@ -265,13 +271,13 @@ class ReedSolomonRecovery:
         for svid in range(Config.NS+1):
             self.rs_data[svid] = ReedSolomonSatellite(svid)
 
-    def add_rs_word(self, wt: int, word: BitArray, svid: int, gst: GST):
+    def add_rs_word(self, wt: int, word: int, svid: int, gst: GST):
         """
         Add a new word to the buffer. Check the IOD to determine if the decoding buffer should be reset.
         """
         self.rs_data[svid].add_word(wt, word, gst)
 
-    def recover_words(self, svid: int) -> dict[int, BitArray]:
+    def recover_words(self, svid: int) -> dict[int, int]:
         """
         Returns the recovered CED words if there are at least 4 pages in total and any CED words are missing.
         Else, return an empty dictionary. May raise `ReedSolomonRecoveryError` if any of the inconsistency checks fail.
@@ -53,6 +53,7 @@ class _StatusLogger:
         self.api_subframe_logger = APISubframeLogger()
         self.json_file_name: Path | None = logs_path / 'status_log.json' if logs_path is not None else None
         self.json_file: TextIOWrapper | None = None
+        self.json_file_closed = False
 
         self.osnma_material_received = {}
         self.nav_data_received = {}
@@ -137,28 +138,18 @@ class _StatusLogger:
     def _get_authenticated_nav_data(self, osnma_r: 'OSNMAReceiver') -> dict:
         osnma_data_dict = {"ADKD0": {}, "ADKD4": {}, "ADKD12": {}}
 
-        auth_data_dict_handler = osnma_r.receiver_state.nav_data_structure.authenticated_data_dict
-        for data_block in auth_data_dict_handler.values():
-            svid = data_block.prn_d
-            adkd = data_block.adkd
-            last_adkd_per_sat = osnma_data_dict[ADKD(adkd).name]
-            if not (saved_data := last_adkd_per_sat.get(svid, False)):
-                last_adkd_per_sat[svid] = data_block
-            elif saved_data.last_gst < data_block.last_gst:
-                last_adkd_per_sat[svid] = data_block
-
-        for adkd in osnma_data_dict.values():
-            for svid in adkd.keys():
-                adkd[svid] = adkd[svid].get_json()
+        latest_auth_data_handler = osnma_r.receiver_state.nav_data_structure.latest_authenticated_data
+        for (adkd, svid), data_block in latest_auth_data_handler.items():
+            osnma_data_dict[ADKD(adkd).name][svid] = data_block.get_json()
 
         return osnma_data_dict
 
     def _parse_tag(self, tag: 'TagAndInfo'):
         tag_dict = {
-            'prn_a': tag.prn_a.uint,
-            'prn_d': tag.prn_d.uint,
-            'adkd': tag.adkd.uint,
-            'cop': tag.cop.uint,
+            'prn_a': tag.prn_a,
+            'prn_d': tag.prn_d,
+            'adkd': tag.adkd,
+            'cop': tag.cop,
             'flx': tag.is_flx,
             'verification': tag.is_verified,
             'GST': [tag.gst_subframe.wn, tag.gst_subframe.tow]
@@ -167,7 +158,7 @@ class _StatusLogger:
 
     def log_auth_macseq(self, macseq: 'MACSeqObject'):
         macseq_dict = {
-            'prn_a': macseq.svid.uint,
+            'prn_a': macseq.svid,
             'flex_tags': [tag.get_json() for tag in macseq.flex_list],
             'verification': macseq.is_verified,
             'GST': [macseq.gst.wn, macseq.gst.tow],
@@ -181,7 +172,7 @@ class _StatusLogger:
     def log_auth_tesla_key(self, tesla_key: 'TESLAKey'):
         tesla_key_dict = {
             'svid': tesla_key.svid,
-            'value': tesla_key.key.hex,
+            'value': tesla_key.key.hex(),
             'verification': tesla_key.verified,
             'GST': [tesla_key.gst_sf.wn, tesla_key.gst_sf.tow],
             'reconstructed': tesla_key.reconstructed
@@ -276,13 +267,13 @@ class _StatusLogger:
     def log_nav_data(self, svid: int, adkd: int, word_type: int):
         self.nav_data_received[svid][ADKD(adkd).name][word_type] = True
 
-    def log_nav_data_iod(self, svid: int,  iod: 'BitArray'):
-        self.nav_data_received[svid]['IOD'] = iod.bin
+    def log_nav_data_iod(self, svid: int,  iod: int):
+        self.nav_data_received[svid]['IOD'] = f"{iod:010b}"
 
     def log_mack_data(self, svid, tag_list: list['TagAndInfo'], tesla_key: 'TESLAKey'):
         osnma_mack_data = self.osnma_material_received[svid]['mack_data']
         osnma_mack_data["tags"] = tag_list
-        osnma_mack_data["tesla_key"] = tesla_key if tesla_key is None else tesla_key.key.hex
+        osnma_mack_data["tesla_key"] = tesla_key if tesla_key is None else tesla_key.key.hex()
 
     def log_hkroot_data(self, svid: int, received_blocks: list['BitArray | None']):
         osnma_hkroot_data = self.osnma_material_received[svid]['hkroot_data']
@@ -325,6 +316,11 @@ class _StatusLogger:
 
     def _json_file_logging(self, status_dict):
         if Config.DO_STATUS_LOG and Config.LOG_FILE:
+            if self.json_file is None and self.json_file_closed:
+                # Continue the list of the file closed at the end of a previous processing call
+                self.json_file = open(self.json_file_name, 'r+')
+                self.json_file.seek(0, 2)
+                self.json_file_closed = False
             if self.json_file is None:
                 self.json_file = open(self.json_file_name, 'w')
                 self.json_file.write("[\n")
@@ -348,7 +344,7 @@ class _StatusLogger:
         status_dict = {
             "metadata": {
                 "GST_subframe": [osnma_r.current_gst_subframe.wn, osnma_r.current_gst_subframe.tow],
-                "input_module": osnma_r.nav_data_input.__class__.__name__,
+                "input_module": osnma_r.input_module_name,
                 "OSNMAlib_status": osnma_r.receiver_state.osnmalib_state.name,
             },
             "OSNMA_status": self._get_osnma_status_dict(osnma_r),
@@ -390,5 +386,7 @@ class _StatusLogger:
     def close(self):
         if self.json_file is not None:
             self.json_file.close()
+            self.json_file = None
+            self.json_file_closed = True
 
 StatusLogger = _StatusLogger()
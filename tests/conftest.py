@@ -0,0 +1,59 @@
+#
+# Copyright © European Union 2022
+#
+# Licensed under the EUPL, Version 1.2 or – as soon they will be approved by
+# the European Commission - subsequent versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at:
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the Licence is distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#
+# See the Licence for the specific language governing permissions and limitations under the Licence.
+#
+
+import sys
+sys.path.insert(0, '..')
+import shutil
+import logging
+from pathlib import Path
+
+import pytest
+
+import osnma.utils.logger_factory as logger_factory
+from osnma.receiver.receiver import OSNMAReceiver
+from osnma.input_formats.base_classes import PageBatch
+from osnma.input_formats.input_misc import ICDTestVectors
+
+CONFIGURATION_1_PATH = Path(__file__).parent / 'icd_test_vectors/configuration_1/'
+CONFIGURATION_1_SCENARIO = CONFIGURATION_1_PATH / '16_AUG_2023_GST_05_00_01_fixed.csv'
+
+
+def run_receiver(exec_path: Path, pages: list, caplog, **config) -> str:
+    """Runs a receiver with the configuration 1 files over the pages and returns the text logged."""
+    config_dict = {
+        'exec_path': exec_path,
+        'logs_path': exec_path,
+        'pubk_name': 'OSNMA_PublicKey.xml',
+        'log_console': False,
+        'log_file': False,
+    }
+    config_dict.update(config)
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger='osnma'):
+        OSNMAReceiver(None, config_dict).process_batch(PageBatch.from_pages(pages))
+    return caplog.text
+
+
+@pytest.fixture(scope='session')
+def configuration_1_pages() -> list:
+    return list(ICDTestVectors(CONFIGURATION_1_SCENARIO))
+
+
+@pytest.fixture
+def configuration_1_exec_path(tmp_path) -> Path:
+    for file_name in ('OSNMA_MerkleTree.xml', 'OSNMA_PublicKey.xml'):
+        shutil.copy(CONFIGURATION_1_PATH / file_name, tmp_path)
+    return tmp_path
@@ -433,7 +433,7 @@ def test_vectors_pkrev_step1(log_level=logging.INFO):
     expected_results = {
         "tags_auth": 6664,
         "data_auth": 3095,
-        "kroot_auth": 117,
+        "kroot_auth": 118,
         "broken_kroot": 0,
         "crc_failed": 0,
         "warnings": 1150,
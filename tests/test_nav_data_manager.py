@@ -0,0 +1,120 @@
+#
+# Copyright © European Union 2022
+#
+# Licensed under the EUPL, Version 1.2 or – as soon they will be approved by
+# the European Commission - subsequent versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at:
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the Licence is distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#
+# See the Licence for the specific language governing permissions and limitations under the Licence.
+#
+
+import sys
+sys.path.insert(0, '..')
+import random
+from types import SimpleNamespace
+
+import osnma.utils.logger_factory as logger_factory
+from osnma.osnma_core.nav_data_manager import NavigationDataManager, ADKD0DataManager, ADKD0DataBlock
+from osnma.cryptographic.gst_class import GST
+from osnma.utils.config import Config
+
+FIRST_TOW = 345600
+
+
+def _tag(data: bytes, tow_offset: int, prn_d: int = 1) -> SimpleNamespace:
+    nav_data = SimpleNamespace(iod=1, nav_data_digest=data)
+    return SimpleNamespace(adkd=0, prn_d=prn_d, tag_size=40, gst_subframe=GST(wn=1248, tow=FIRST_TOW + tow_offset),
+                           nav_data=nav_data, data_id=(0, prn_d, data))
+
+
+def test_retained_authenticated_data_late_tag(monkeypatch):
+    monkeypatch.setattr(Config, 'AUTHENTICATED_DATA_PER_SATELLITE', 2)
+    nav_data_m = NavigationDataManager()
+
+    for data, tow_offset in ((b'A', 0), (b'B', 30), (b'C', 60)):
+        nav_data_m.new_tag_verified(_tag(data, tow_offset))
+
+    # Above the count, the blocks are retained while they can still receive tags
+    assert (0, 1, b'A') in nav_data_m.authenticated_data_dict
+    auth_data_a = nav_data_m.authenticated_data_dict[(0, 1, b'A')]
+
+    # A late tag accumulates on the retained block instead of creating a new one
+    nav_data_m.new_tag_verified(_tag(b'A', 90))
+    assert nav_data_m.authenticated_data_dict[(0, 1, b'A')] is auth_data_a
+    assert auth_data_a.acc_length == 80
+
+    # Blocks from other satellites are not counted
+    nav_data_m.new_tag_verified(_tag(b'A', 600, prn_d=2))
+
+    # Once out of the tag window, the oldest blocks are removed down to the count
+    nav_data_m.new_tag_verified(_tag(b'D', 90 + Config.AUTHENTICATED_DATA_TAG_WINDOW + 30))
+    assert [data_id for data_id in nav_data_m.authenticated_data_dict if data_id[1] == 1] == [(0, 1, b'C'), (0, 1, b'D')]
+    assert nav_data_m.latest_authenticated_data[(0, 1)] is nav_data_m.authenticated_data_dict[(0, 1, b'D')]
+    assert (0, 2, b'A') in nav_data_m.authenticated_data_dict
+
+
+def _cop_tag(tow_offset: int, cop: int) -> SimpleNamespace:
+    gst_sf = GST(wn=1248, tow=FIRST_TOW + tow_offset)
+    return SimpleNamespace(gst_subframe=gst_sf, cop=cop, prn_a=1, prn_d=1, is_flx=False,
+                           tesla_key=SimpleNamespace(gst_start=gst_sf + 30))
+
+
+def _linear_search(data_blocks: list[ADKD0DataBlock], tag: SimpleNamespace) -> ADKD0DataBlock | None:
+    tag_data_gst_sf_limit = tag.gst_subframe - 30 * tag.cop
+    for nav_data in data_blocks:
+        if not nav_data.gst_completed:
+            break
+        if tag_data_gst_sf_limit <= nav_data.gst_start < tag.gst_subframe:
+            if nav_data.gst_completed >= tag.tesla_key.gst_start - Config.TS:
+                return None
+            return nav_data
+        elif nav_data.gst_start < tag_data_gst_sf_limit < nav_data.last_gst_updated:
+            return nav_data
+    return None
+
+
+def test_adkd0_bisect_search_with_cop_updates():
+    rng = random.Random(44)
+    adkd0_data_m = ADKD0DataManager(1)
+
+    tow_offset = 0
+    for _ in range(20):
+        tow_offset += 30 * rng.randint(1, 20)
+        data_block = ADKD0DataBlock(GST(wn=1248, tow=FIRST_TOW + tow_offset))
+        data_block.gst_completed = data_block.gst_start + rng.randint(0, 40)
+        if adkd0_data_m.adkd0_data_blocks:
+            adkd0_data_m.adkd0_data_blocks[-1].last_gst_updated = data_block.gst_start - 1
+        data_block.last_gst_updated = data_block.gst_completed
+        adkd0_data_m._append_data_block(data_block)
+
+        # The COP may point before the start of the previous data block
+        tow_offset += 30 * rng.randint(1, 3)
+        adkd0_data_m.update_gst_start_with_cop(_cop_tag(tow_offset, rng.randint(0, 15)))
+
+        assert adkd0_data_m.gst_starts == sorted(adkd0_data_m.gst_starts)
+        assert adkd0_data_m.gst_starts == [block.gst_start.int for block in adkd0_data_m.adkd0_data_blocks]
+
+    for tag_tow_offset in range(0, tow_offset + 600, 30):
+        for cop in range(16):
+            tag = _cop_tag(tag_tow_offset, cop)
+            assert adkd0_data_m.get_nav_data(tag) is _linear_search(adkd0_data_m.adkd0_data_blocks, tag)
+
+
+def test_adkd0_cop_update_clamped_to_previous_block():
+    adkd0_data_m = ADKD0DataManager(1)
+    for tow_offset in (0, 300):
+        data_block = ADKD0DataBlock(GST(wn=1248, tow=FIRST_TOW + tow_offset))
+        data_block.gst_completed = data_block.last_gst_updated = data_block.gst_start + 20
+        adkd0_data_m._append_data_block(data_block)
+
+    # The COP start is before the previous block, the new block can only start after its last update
+    adkd0_data_m.update_gst_start_with_cop(_cop_tag(330, 15))
+
+    assert adkd0_data_m.adkd0_data_blocks[1].gst_start == GST(wn=1248, tow=FIRST_TOW + 21)
+    assert adkd0_data_m.gst_starts == sorted(adkd0_data_m.gst_starts)
@@ -0,0 +1,144 @@
+#
+# Copyright © European Union 2022
+#
+# Licensed under the EUPL, Version 1.2 or – as soon they will be approved by
+# the European Commission - subsequent versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at:
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the Licence is distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#
+# See the Licence for the specific language governing permissions and limitations under the Licence.
+#
+
+import sys
+sys.path.insert(0, '..')
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+from bitstring import BitArray
+
+from osnma.receiver.receiver import OSNMAReceiver
+from osnma.input_formats.base_classes import DataFormat, PageBatch, GAL_BAND
+from osnma.input_formats.input_misc import ICDTestVectors
+from osnma.cryptographic.gst_class import GST
+from osnma.utils.status_logger import StatusLogger
+
+CONFIGURATION_1_PATH = Path(__file__).parent / 'icd_test_vectors/configuration_1/'
+CONFIGURATION_1_SCENARIO = CONFIGURATION_1_PATH / '16_AUG_2023_GST_05_00_01_fixed.csv'
+
+
+def _page_bits(osnma_field: int, first_bits: int = 0x2A) -> BitArray:
+    nav_bits = BitArray(240)
+    nav_bits[2:8] = BitArray(uint=first_bits & 0x3F, length=6)
+    nav_bits[DataFormat.osnma_start:DataFormat.osnma_end] = BitArray(uint=osnma_field, length=40)
+    return nav_bits
+
+
+def _assert_same_page(page: DataFormat, batch_page: DataFormat):
+    assert batch_page.svid == page.svid
+    assert batch_page.gst_page == page.gst_page
+    assert batch_page.nav_bits == page.nav_bits
+    assert batch_page.band == page.band
+    assert batch_page.crc == page.crc
+    assert batch_page.has_osnma == page.has_osnma
+    assert batch_page.dsm_id == page.dsm_id
+    assert batch_page.bid == page.bid
+    assert batch_page.independent_clock == page.independent_clock
+
+
+def test_page_batch_round_trip():
+    pages = [
+        DataFormat(11, 1248, 345602, _page_bits(0xC1_0000_0001)),
+        DataFormat(12, 1248, 345603, BitArray(240)),
+        DataFormat(12, 1248, 345604, _page_bits(0xFF_FFFF_FFFF), crc=False),
+        DataFormat(19, 1248, 345604, _page_bits(0x12_3456_789A), band=GAL_BAND.E5b),
+        DataFormat(19, 1248, 345606, _page_bits(0), independent_clock=GST(wn=1248, tow=345607)),
+    ]
+
+    batch = PageBatch.from_pages(pages)
+
+    assert len(batch) == len(pages)
+    assert batch.crc == [True, True, False, True, True]
+    assert batch.gst_seconds == [page.gst_page.total_seconds for page in pages]
+    for index, page in enumerate(pages):
+        _assert_same_page(page, batch.get_page(index))
+
+
+def test_page_batch_empty():
+    batch = PageBatch.from_pages([])
+
+    assert len(batch) == 0
+    assert batch.nav_bits == []
+    assert batch.independent_clock == []
+
+
+def test_page_batch_bits_formats():
+    nav_bits = _page_bits(0xC1_0000_0001)
+
+    assert PageBatch._bits_to_int(nav_bits) == nav_bits.uint
+    assert PageBatch._bits_to_int(nav_bits.bytes) == nav_bits.uint
+    assert PageBatch._bits_to_int(nav_bits.uint) == nav_bits.uint
+    assert PageBatch._bits_to_int(0) == 0
+
+    with pytest.raises(ValueError):
+        PageBatch._bits_to_int(BitArray(120))
+    with pytest.raises(ValueError):
+        PageBatch._bits_to_int(bytes(31))
+    with pytest.raises(ValueError):
+        PageBatch._bits_to_int(1 << 240)
+    with pytest.raises(ValueError):
+        PageBatch([1, 2], [1248], [345600], [0])
+
+
+def _run_configuration_1(tmp_path: Path, name: str, batches: list[list[DataFormat]] | None = None) -> list[dict]:
+    exec_path = tmp_path / name
+    exec_path.mkdir()
+    for file_name in ('OSNMA_MerkleTree.xml', 'OSNMA_PublicKey.xml'):
+        shutil.copy(CONFIGURATION_1_PATH / file_name, exec_path)
+
+    config_dict = {
+        'exec_path': exec_path,
+        'logs_path': exec_path,
+        'pubk_name': 'OSNMA_PublicKey.xml',
+        'do_status_log': True,
+        'log_console': False,
+    }
+
+    if batches is None:
+        osnma_r = OSNMAReceiver(ICDTestVectors(CONFIGURATION_1_SCENARIO), config_dict)
+        osnma_r.start()
+    else:
+        osnma_r = OSNMAReceiver(None, config_dict)
+        for batch in batches:
+            osnma_r.process_batch(PageBatch.from_pages(batch))
+
+    with open(StatusLogger.json_file_name, 'r') as status_file:
+        status_log = json.load(status_file)
+    for status in status_log:
+        status['metadata'].pop('input_module')
+    return status_log
+
+
+def test_process_batch_same_as_start(tmp_path):
+    pages = list(ICDTestVectors(CONFIGURATION_1_SCENARIO))
+    middle = len(pages) // 2 + 7  # Split the batches in the middle of a subframe
+
+    start_status_log = _run_configuration_1(tmp_path, 'start')
+    batch_status_log = _run_configuration_1(tmp_path, 'batch', [pages[:middle], pages[middle:]])
+
+    assert len(start_status_log) > 100
+    assert batch_status_log == start_status_log
+
+
+def test_start_without_input_module(tmp_path):
+    shutil.copy(CONFIGURATION_1_PATH / 'OSNMA_MerkleTree.xml', tmp_path)
+    osnma_r = OSNMAReceiver(None, {'exec_path': tmp_path, 'logs_path': tmp_path, 'log_console': False})
+
+    with pytest.raises(ValueError):
+        osnma_r.start()
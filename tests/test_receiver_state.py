@@ -0,0 +1,236 @@
+#
+# Copyright © European Union 2022
+#
+# Licensed under the EUPL, Version 1.2 or – as soon they will be approved by
+# the European Commission - subsequent versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at:
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the Licence is distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#
+# See the Licence for the specific language governing permissions and limitations under the Licence.
+#
+
+import sys
+sys.path.insert(0, '..')
+import re
+
+import pytest
+from bitstring import BitArray
+
+import osnma.utils.logger_factory as logger_factory
+from osnma.osnma_core.receiver_state import MACKBacklog, ReceiverState
+from osnma.receiver.satellite import Satellite
+from osnma.structures.fields_information import OSNMAlibSTATE, NMAS, CPKS
+from osnma.cryptographic.gst_class import GST
+from osnma.utils.iohandler import IOHandler
+from osnma.utils.config import Config
+
+from tests.conftest import run_receiver
+
+FIRST_TOW = 345600
+
+
+def _mack_subframe(number: int) -> tuple[list[BitArray | None], GST, int, BitArray]:
+    pages = [BitArray(uint=(number << 4) | page, length=32) for page in range(15)]
+    pages[number % 15] = None
+    return pages, GST(wn=1248, tow=FIRST_TOW + 30 * number), number % 36 + 1, BitArray(uint=number % 4, length=2)
+
+
+def _drained(backlog: MACKBacklog) -> list[tuple[list[str | None], str, int, int]]:
+    return [([None if page is None else page.hex for page in pages], str(gst_sf), svid, nma_status.uint)
+            for pages, gst_sf, svid, nma_status, _ in backlog.drain()]
+
+
+def _expected(numbers: range) -> list[tuple[list[str | None], str, int, int]]:
+    expected = []
+    for number in numbers:
+        pages, gst_sf, svid, nma_status = _mack_subframe(number)
+        expected.append(([None if page is None else page.hex for page in pages], str(gst_sf), svid, nma_status.uint))
+    return expected
+
+
+@pytest.fixture
+def spill_config(monkeypatch):
+    monkeypatch.setattr(Config, 'DO_MACK_BACKLOG_SPILL', True)
+    monkeypatch.setattr(Config, 'MACK_BACKLOG_MEMORY_SIZE', 4)
+    monkeypatch.setattr(Config, 'MACK_BACKLOG_HORIZON', 3600)
+
+
+def test_mack_backlog_spill_and_read_back(tmp_path, spill_config):
+    backlog = MACKBacklog(IOHandler(tmp_path))
+    for number in range(11):
+        backlog.append(*_mack_subframe(number))
+
+    # The oldest subframes are moved to the file, leaving half of the memory size
+    assert backlog.spilled == 9 and len(backlog.mack_subframes) == 2 and len(backlog) == 11
+    assert (tmp_path / Config.MACK_BACKLOG_NAME).exists()
+
+    # The spilled subframes are read back first, in reception order
+    assert _drained(backlog) == _expected(range(11))
+    assert len(backlog) == 0 and backlog.spilled == 0
+    assert not (tmp_path / Config.MACK_BACKLOG_NAME).exists()
+
+
+def test_mack_backlog_horizon(tmp_path, spill_config, monkeypatch):
+    monkeypatch.setattr(Config, 'MACK_BACKLOG_HORIZON', 30 * 5)
+    backlog = MACKBacklog(IOHandler(tmp_path))
+    for number in range(9):
+        backlog.append(*_mack_subframe(number))
+
+    # Part of the spilled subframes are still inside the horizon, the older ones are skipped when read back
+    assert backlog.spilled == 6 and backlog.dropped == 0
+    assert _drained(backlog) == _expected(range(3, 9))
+
+    for number in range(9, 20):
+        backlog.append(*_mack_subframe(number))
+    assert backlog.spilled > 0
+
+    # After a reception gap the whole file is removed, its newest subframe is out of the horizon
+    for number in (40, 41):
+        backlog.append(*_mack_subframe(number))
+    assert backlog.spilled == 0 and backlog.dropped == 11
+    assert not (tmp_path / Config.MACK_BACKLOG_NAME).exists()
+    assert _drained(backlog) == _expected(range(40, 42))
+
+
+def test_mack_backlog_spilled_file_removed_at_start(tmp_path, spill_config):
+    IOHandler(tmp_path).append_mack_subframes([_mack_subframe(0)], Config.MACK_BACKLOG_NAME)
+
+    backlog = MACKBacklog(IOHandler(tmp_path))
+
+    assert not (tmp_path / Config.MACK_BACKLOG_NAME).exists()
+    assert len(backlog) == 0
+
+
+def _nma_header(nma_status: NMAS, chain_id: int, chain_status: CPKS) -> BitArray:
+    return BitArray(uint=(nma_status << 6) | (chain_id << 4) | (chain_status << 1), length=8)
+
+
+class _KeyParsingChain:
+
+    def __init__(self):
+        self.chain_id = 1
+        self.last_tesla_key_page = 12
+        self.parsed_keys = 0
+
+    def parse_tesla_key(self, mack_subframe, gst_subframe, svid):
+        self.parsed_keys += 1
+        return None
+
+
+def _receiver_state_started(tesla_chain: _KeyParsingChain) -> ReceiverState:
+    receiver_state = ReceiverState.__new__(ReceiverState)
+    receiver_state.osnmalib_state = OSNMAlibSTATE.STARTED
+    receiver_state.nma_status = NMAS.OPERATIONAL
+    receiver_state.tesla_chain_force = tesla_chain
+    return receiver_state
+
+
+def _satellite_with_header(nma_status: NMAS, chain_id: int, chain_status: CPKS) -> Satellite:
+    satellite = Satellite(1)
+    satellite.hkroot_subframe[0] = _nma_header(nma_status, chain_id, chain_status)
+    return satellite
+
+
+def test_tesla_key_pages_parsed_once():
+    tesla_chain = _KeyParsingChain()
+    receiver_state = _receiver_state_started(tesla_chain)
+    satellite = _satellite_with_header(NMAS.OPERATIONAL, 1, CPKS.NOMINAL)
+    gst_sf = GST(wn=1248, tow=FIRST_TOW)
+
+    # Not parsed until the page with the last bits of the key
+    for page_number in range(tesla_chain.last_tesla_key_page):
+        receiver_state.process_tesla_key_pages(gst_sf, satellite, page_number)
+    assert tesla_chain.parsed_keys == 0 and not satellite.tesla_key_processed
+
+    # Parsed once even if pages are missing, then left to the end of the subframe
+    receiver_state.process_tesla_key_pages(gst_sf, satellite, tesla_chain.last_tesla_key_page)
+    assert tesla_chain.parsed_keys == 1
+    assert satellite.tesla_key_processed and satellite.tesla_key is None
+
+
+@pytest.mark.parametrize('nma_status, chain_id, chain_status', [
+    (NMAS.OPERATIONAL, 2, CPKS.NOMINAL),
+    (NMAS.OPERATIONAL, 1, CPKS.EOC),
+    (NMAS.DONT_USE, 1, CPKS.CREV),
+    (NMAS.DONT_USE, 1, CPKS.NOMINAL),
+])
+def test_tesla_key_pages_not_added_on_chain_changes(nma_status, chain_id, chain_status):
+    tesla_chain = _KeyParsingChain()
+    receiver_state = _receiver_state_started(tesla_chain)
+    satellite = _satellite_with_header(nma_status, chain_id, chain_status)
+
+    receiver_state.process_tesla_key_pages(GST(wn=1248, tow=FIRST_TOW), satellite, tesla_chain.last_tesla_key_page)
+
+    # Processed at the end of the subframe, after the NMA header
+    assert tesla_chain.parsed_keys == 0
+    assert satellite.tesla_key_processed and satellite.tesla_key is None
+
+
+@pytest.fixture
+def cold_start_state() -> ReceiverState:
+    receiver_state = ReceiverState.__new__(ReceiverState)
+    receiver_state.pkr_dict = {2: None}
+    receiver_state.processed_kroots = []
+    receiver_state.process_kroot_message = lambda *kroot: receiver_state.processed_kroots.append(kroot)
+    return receiver_state
+
+
+def _kroot(pkid: int) -> BitArray:
+    return BitArray(uint=(1 << 12) | (pkid << 8), length=16)
+
+
+def test_cold_start_kroot_processed_with_same_header(cold_start_state):
+    nma_header = _nma_header(NMAS.OPERATIONAL, 1, CPKS.NOMINAL)
+    cold_start_state.cold_start_kroot = (nma_header, _kroot(2))
+
+    cold_start_state._process_cold_start_kroot(_nma_header(NMAS.OPERATIONAL, 1, CPKS.NOMINAL))
+
+    assert cold_start_state.processed_kroots == [(nma_header, _kroot(2))]
+    assert cold_start_state.cold_start_kroot is None
+
+
+@pytest.mark.parametrize('current_nma_header, kroot', [
+    (_nma_header(NMAS.OPERATIONAL, 2, CPKS.NOMINAL), _kroot(2)),
+    (_nma_header(NMAS.OPERATIONAL, 1, CPKS.EOC), _kroot(2)),
+    (_nma_header(NMAS.DONT_USE, 1, CPKS.NOMINAL), _kroot(2)),
+    (None, _kroot(2)),
+    (_nma_header(NMAS.OPERATIONAL, 1, CPKS.NOMINAL), _kroot(3)),
+])
+def test_cold_start_kroot_not_processed(cold_start_state, current_nma_header, kroot):
+    cold_start_state.cold_start_kroot = (_nma_header(NMAS.OPERATIONAL, 1, CPKS.NOMINAL), kroot)
+
+    cold_start_state._process_cold_start_kroot(current_nma_header)
+
+    # The stale DSM-KROOT is discarded and the next one is used
+    assert cold_start_state.processed_kroots == []
+    assert cold_start_state.cold_start_kroot is None
+
+
+@pytest.fixture(scope='module')
+def configuration_1_first_third(configuration_1_pages) -> list:
+    return configuration_1_pages[:len(configuration_1_pages) // 3]
+
+
+def test_mack_backlog_parsed_again_with_other_chain_parameters(configuration_1_exec_path, configuration_1_first_third,
+                                                                caplog, monkeypatch):
+    log_text = run_receiver(configuration_1_exec_path, configuration_1_first_third, caplog)
+
+    # The DSM-KROOT block read before the KROOT is verified announces a different tag size
+    set_mack_parser = MACKBacklog.set_mack_parser
+    monkeypatch.setattr(MACKBacklog, 'set_mack_parser',
+                        lambda backlog, chain_id, key_size, tag_size: set_mack_parser(backlog, chain_id, key_size, 20))
+    log_other_parameters = run_receiver(configuration_1_exec_path, configuration_1_first_third, caplog)
+
+    assert 'key size 128, tag size 40.' in log_text and 'key size 128, tag size 20.' in log_other_parameters
+    assert len(re.findall('-- OLD SUBFRAME --', log_other_parameters)) > 0
+
+    # The subframes parsed with the wrong parameters are parsed again with the ones of the verified chain
+    assert 'ERROR' not in log_other_parameters
+    tags = re.findall(r'Tag AUTHENTICATED\n\t(.*)', log_text)
+    assert re.findall(r'Tag AUTHENTICATED\n\t(.*)', log_other_parameters) == tags
+    assert len(tags) > 0
@@ -0,0 +1,123 @@
+#
+# Copyright © European Union 2022
+#
+# Licensed under the EUPL, Version 1.2 or – as soon they will be approved by
+# the European Commission - subsequent versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at:
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the Licence is distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#
+# See the Licence for the specific language governing permissions and limitations under the Licence.
+#
+
+import sys
+sys.path.insert(0, '..')
+
+import pytest
+from bitstring import BitArray
+
+import osnma.utils.logger_factory as logger_factory
+from osnma.receiver.subframe_regen import SubFrameRegenerator, RegenBlock, HKROOT_PAGES
+from osnma.cryptographic.gst_class import GST
+from osnma.utils.status_logger import StatusLogger
+from osnma.utils.config import Config
+
+FIRST_TOW = 345600
+DSM_ID = 2
+BID = 5
+
+
+def _hkroot_pages(content: int = 0xA0) -> list[BitArray]:
+    pages = [BitArray(uint=0x52, length=8), BitArray(uint=(DSM_ID << 4) | BID, length=8)]
+    pages += [BitArray(uint=(content + page) % 256, length=8) for page in range(2, HKROOT_PAGES)]
+    return pages
+
+
+def _received(pages: list[BitArray], received: range) -> list[BitArray | None]:
+    return [page if index in received else None for index, page in enumerate(pages)]
+
+
+def _gst_subframe(subframe: int) -> GST:
+    return GST(wn=1248, tow=FIRST_TOW + 30 * subframe)
+
+
+@pytest.fixture(autouse=True)
+def no_status_log(monkeypatch):
+    monkeypatch.setattr(StatusLogger, 'log_hkroot_data', lambda svid, hkroot_subframe: None)
+
+
+def test_regen_block_merge():
+    pages = _hkroot_pages()
+    block = RegenBlock(_received(pages, range(0, 6)), _gst_subframe(0))
+    assert not block.is_complete()
+
+    block.merge(_received(pages, range(4, 10)), _gst_subframe(1))
+    block.merge(_received(pages, range(10, HKROOT_PAGES)), _gst_subframe(2))
+
+    # The GST is the one of the first pages, so a block never completed expires
+    assert block.is_complete() and block.gst == _gst_subframe(0)
+    assert block.get_block() == BitArray().join(pages)
+
+
+def test_regen_block_reset_on_different_page():
+    block = RegenBlock(_received(_hkroot_pages(), range(0, 10)), _gst_subframe(0))
+
+    # A new DSM with the same ID and BID, the pages saved are discarded
+    new_pages = _hkroot_pages(content=0x10)
+    block.merge(_received(new_pages, range(0, 5)), _gst_subframe(4))
+    assert block.mask == (1 << 5) - 1 and block.gst == _gst_subframe(4)
+
+    block.merge(_received(new_pages, range(5, HKROOT_PAGES)), _gst_subframe(5))
+    assert block.get_block() == BitArray().join(new_pages)
+
+
+def test_regeneration_across_satellites():
+    pages = _hkroot_pages()
+    regenerator = SubFrameRegenerator()
+
+    complete_block, nma_status = regenerator.load_dsm_block(
+        [None if 4 <= index < 8 else page for index, page in enumerate(pages)], _gst_subframe(0), svid=11)
+    assert not complete_block and nma_status == pages[0][:2]
+    assert regenerator.get_regenerated_blocks() == []
+
+    # Another satellite transmits the block in the next subframe, broken at the start
+    hkroot_subframe = [None] * HKROOT_PAGES
+    regenerated = []
+    for index in range(1, HKROOT_PAGES):
+        hkroot_subframe[index] = pages[index]
+        regenerated.append(regenerator.load_dsm_pages(hkroot_subframe, _gst_subframe(1)))
+
+    # Completed as soon as the missing pages are received, before the end of the subframe
+    assert regenerated[:6] == [None] * 6
+    assert regenerated[6] == (BitArray().join(pages), BID)
+    assert regenerated[7:] == [None] * 7
+
+    # The pages of the satellite are not saved again at the end of the subframe
+    complete_block, _ = regenerator.load_dsm_block(hkroot_subframe, _gst_subframe(1), svid=12)
+    assert not complete_block
+    assert regenerator.regen_buffers == {}
+    assert regenerator.get_regenerated_blocks() == []
+
+    # In a later subframe the block can be regenerated again
+    regenerator.load_dsm_block(_received(pages, range(0, 8)), _gst_subframe(2), svid=11)
+    regenerator.load_dsm_block(_received(pages, range(1, HKROOT_PAGES)), _gst_subframe(2), svid=12)
+    assert regenerator.get_regenerated_blocks() == [(BitArray().join(pages), BID)]
+
+
+def test_regeneration_expired_blocks(monkeypatch):
+    monkeypatch.setattr(Config, 'HKROOT_REGEN_MAX_AGE', 30 * 4)
+    pages = _hkroot_pages()
+    regenerator = SubFrameRegenerator()
+
+    # Merging pages already saved does not keep the block alive
+    for subframe in range(5):
+        regenerator.load_dsm_block(_received(pages, range(0, 8)), _gst_subframe(subframe), svid=11)
+    assert regenerator.regen_buffers[DSM_ID][BID].gst == _gst_subframe(0)
+
+    regenerator.load_dsm_block(_received(pages, range(0, 3)), _gst_subframe(5), svid=11)
+    assert regenerator.regen_buffers[DSM_ID][BID].mask == (1 << 3) - 1
+    assert regenerator.regen_buffers[DSM_ID][BID].gst == _gst_subframe(5)
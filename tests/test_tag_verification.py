@@ -0,0 +1,140 @@
+#
+# Copyright © European Union 2022
+#
+# Licensed under the EUPL, Version 1.2 or – as soon they will be approved by
+# the European Commission - subsequent versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at:
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the Licence is distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#
+# See the Licence for the specific language governing permissions and limitations under the Licence.
+#
+
+import sys
+sys.path.insert(0, '..')
+import re
+from pathlib import Path
+
+import osnma.utils.logger_factory as logger_factory
+from osnma.osnma_core.tag_verification import PendingKeyQueue, TagStateStructure
+from osnma.utils.config import Config
+
+from tests.conftest import run_receiver
+
+
+class _Pending:
+
+    def __init__(self, name: str, key_id: int):
+        self.name = name
+        self.key_id = key_id
+
+    def __repr__(self):
+        return self.name
+
+
+def _names(pending_list: list[_Pending]) -> list[str]:
+    return [pending.name for pending in pending_list]
+
+
+def test_pending_queue_release_by_key_index():
+    queue = PendingKeyQueue(max_size=100)
+    queue.extend([_Pending('a5', 5), _Pending('a3', 3), _Pending('b5', 5), _Pending('a7', 7), _Pending('b3', 3)])
+
+    assert _names(queue.release(2)) == []
+    assert _names(queue.release(3)) == ['a3', 'b3']
+    assert len(queue) == 3
+
+    # Several buckets are returned in arrival order, not in key index order
+    queue.append(_Pending('c5', 5))
+    queue.append(_Pending('b7', 7))
+    assert _names(queue.release(7)) == ['a5', 'b5', 'a7', 'c5', 'b7']
+    assert len(queue) == 0 and queue.buckets == {} and queue.key_id_heap == []
+
+
+def test_pending_queue_out_of_order_same_key():
+    queue = PendingKeyQueue(max_size=100)
+    queue.append(_Pending('late_key', 9))
+    queue.append(_Pending('first', 4))
+    queue.append(_Pending('old_key', 2))
+    queue.append(_Pending('second', 4))
+
+    assert _names(queue.release(4)) == ['first', 'old_key', 'second']
+    assert _names(queue.release(9)) == ['late_key']
+
+
+def test_pending_queue_max_size_eviction():
+    queue = PendingKeyQueue(max_size=4)
+    queue.extend([_Pending('a6', 6), _Pending('a2', 2), _Pending('b2', 2), _Pending('a4', 4)])
+    assert len(queue) == 4
+
+    # Above the maximum, the whole bucket of the oldest key is evicted
+    queue.append(_Pending('b6', 6))
+    assert len(queue) == 3
+    assert 2 not in queue.buckets
+
+    queue.append(_Pending('a8', 8))
+    queue.append(_Pending('b8', 8))
+    assert len(queue) == 4
+    assert _names(queue.release(10)) == ['a6', 'b6', 'a8', 'b8']
+
+
+def test_pending_queue_expire():
+    queue = PendingKeyQueue(max_size=100)
+    queue.extend([_Pending('a1', 1), _Pending('a3', 3), _Pending('b1', 1), _Pending('a5', 5)])
+
+    assert queue.expire(1) == 0
+    assert queue.expire(4) == 3
+    assert len(queue) == 1
+    assert queue.expire(4) == 0
+    assert _names(queue.release(5)) == ['a5']
+
+
+class _TagWithoutData(_Pending):
+
+    def __init__(self, name: str):
+        super().__init__(name, key_id=1)
+        self.prn_a = self.prn_d = 1
+        self.adkd = 0
+
+
+class _NoDataManager:
+
+    def get_data(self, tag):
+        return None
+
+
+def test_tags_with_key_awaiting_data_max_size(monkeypatch):
+    monkeypatch.setattr(Config, 'PENDING_TAGS_MAX', 3)
+    monkeypatch.setattr(Config, 'DO_COP_LINK_OPTIMIZATION', True)
+    tag_state = TagStateStructure(None, _NoDataManager())
+
+    tag_state._verify_tags_with_data([_TagWithoutData(name) for name in ('a', 'b', 'c', 'd', 'e')])
+
+    # The oldest tags are dropped when the queue is full
+    assert _names(tag_state.tags_with_key_awaiting_data) == ['c', 'd', 'e']
+
+    # A tag still without data is kept in its place when the queue is visited again
+    tags_awaiting_data = list(tag_state.tags_with_key_awaiting_data)
+    tag_state.tags_with_key_awaiting_data.clear()
+    tag_state._verify_tags_with_data(tags_awaiting_data + [_TagWithoutData('f')])
+    assert _names(tag_state.tags_with_key_awaiting_data) == ['d', 'e', 'f']
+
+
+def _authenticated_tags(exec_path: Path, pages: list, caplog, **config) -> list[str]:
+    log_text = run_receiver(exec_path, pages, caplog, **config)
+    assert 'Tag FAILED' not in log_text and 'ERROR' not in log_text
+    return re.findall(r'Tag AUTHENTICATED\n\t(.*)', log_text)
+
+
+def test_cop_link_optimization_tags_awaiting_data(configuration_1_exec_path, configuration_1_pages, caplog):
+    pages = configuration_1_pages[:len(configuration_1_pages) // 3]
+
+    tags = _authenticated_tags(configuration_1_exec_path, pages, caplog)
+    tags_cop = _authenticated_tags(configuration_1_exec_path, pages, caplog, do_cop_link_optimization=True)
+
+    # The tags with key waiting for data are authenticated in batches once the data is linked by the COP
+    assert set(tags) < set(tags_cop)
@@ -0,0 +1,226 @@
+#
+# Copyright © European Union 2022
+#
+# Licensed under the EUPL, Version 1.2 or – as soon they will be approved by
+# the European Commission - subsequent versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at:
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the Licence is distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#
+# See the Licence for the specific language governing permissions and limitations under the Licence.
+#
+
+import sys
+sys.path.insert(0, '..')
+import re
+import hmac
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from osnma.osnma_core.tesla_chain import TESLAChain, TESLAKeyCache, TESLAKeyCheckpoints, MAC_CONTEXT_CACHE_SIZE
+from osnma.structures.mack_structures import TESLAKey
+from osnma.cryptographic.gst_class import GST
+
+from Crypto.Hash import CMAC
+from Crypto.Cipher import AES
+
+from tests.conftest import run_receiver
+
+TESLA_KEY_FILE = 'OSNMA_last_TESLA_key.txt'
+KROOT_FILE = 'OSNMA_last_KROOT.txt'
+
+
+def _key(index: int, tow: int = None) -> TESLAKey:
+    tow = 345600 + 30 * index if tow is None else tow
+    return TESLAKey(GST(wn=1248, tow=tow), index.to_bytes(16, 'big'), svid=1, index=index)
+
+
+def test_key_cache_lru_eviction():
+    cache = TESLAKeyCache(max_size=3, max_age=3600)
+    for index in (1, 2, 3):
+        cache.add(_key(index))
+
+    # Using the key 1 makes the key 2 the least recently used
+    assert cache.get(1).index == 1
+    cache.add(_key(4))
+
+    assert cache.get(2) is None
+    assert [index for index in cache.keys] == [3, 1, 4]
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_key_cache_evict_older_than():
+    cache = TESLAKeyCache(max_size=10, max_age=60)
+    for index in range(5):
+        cache.add(_key(index))
+    # Key 0 is added again with a recent GST, the first insertion must not evict it
+    cache.add(_key(0, tow=345600 + 30 * 4))
+
+    cache.evict_older_than(GST(wn=1248, tow=345600 + 30 * 4))
+
+    assert sorted(cache.keys) == [0, 2, 3, 4]
+
+    cache.evict_older_than(GST(wn=1248, tow=345600 + 30 * 10))
+    assert len(cache.keys) == 0
+
+
+def test_key_cache_evicts_old_key_added_after_newer_key():
+    cache = TESLAKeyCache(max_size=10, max_age=60)
+    # A derived key older than the verified key already cached, and the verified key added again many times
+    cache.add(_key(1000))
+    cache.add(_key(10))
+    for _ in range(100):
+        cache.add(_key(1000))
+
+    cache.evict_older_than(_key(1000).gst_sf)
+
+    assert list(cache.keys) == [1000]
+
+
+def test_checkpoints_boundaries():
+    checkpoints = TESLAKeyCheckpoints(interval=8, recent_size=2)
+    for index in (0, 8, 16, 17, 18):
+        checkpoints.add(_key(index))
+
+    assert checkpoints.get_below(8).index == 8
+    assert checkpoints.get_below(15).index == 8
+    assert checkpoints.get_below(16).index == 16
+    assert checkpoints.get_above(9).index == 16
+    assert checkpoints.get_above(16).index == 16
+    assert checkpoints.get_above(19) is None
+    assert checkpoints.get_below(18).index == 18
+
+    # Only the two most recent non sparse keys are kept
+    checkpoints.add(_key(19))
+    assert checkpoints.indexes == [0, 8, 16, 18, 19]
+    assert checkpoints.get_above(17).index == 18
+    assert checkpoints.get_below(17).index == 16
+
+    # Sparse keys are kept for the whole chain
+    checkpoints.add(_key(20))
+    checkpoints.add(_key(21))
+    assert checkpoints.indexes == [0, 8, 16, 20, 21]
+    assert checkpoints.is_sparse_index(24) and not checkpoints.is_sparse_index(25)
+
+
+def _mac_only_chain(mac_function_name: str) -> TESLAChain:
+    """TESLA chain with only the MAC functions initialized, the rest of the chain is not needed to compute MACs."""
+    tesla_chain = TESLAChain.__new__(TESLAChain)
+    tesla_chain.mac_contexts = {}
+    tesla_chain.mac_function = getattr(tesla_chain, mac_function_name)
+    return tesla_chain
+
+
+def test_hmac_sha256_with_cached_context():
+    tesla_chain = _mac_only_chain('_hmac256')
+    keys = [bytes(range(size)) for size in (16, 20, 32, 64, 80)]
+    keys += [index.to_bytes(16, 'big') for index in range(MAC_CONTEXT_CACHE_SIZE)]
+    messages = [b'', b'\x01', bytes(range(76)), bytes(200)]
+
+    for key in keys:
+        expected = [hmac.new(key, message, hashlib.sha256).digest() for message in messages]
+        assert [tesla_chain._hmac256(key, message) for message in messages] == expected
+        assert tesla_chain.compute_macs(key, messages) == expected
+        # The cached context is not modified by the MACs computed
+        assert tesla_chain.compute_macs(key, messages) == expected
+
+    assert len(tesla_chain.mac_contexts) == MAC_CONTEXT_CACHE_SIZE
+
+
+def test_cmac_aes_with_cached_context():
+    tesla_chain = _mac_only_chain('_cmac_aes')
+    messages = [b'', bytes(range(76)), bytes(200)]
+
+    for key in (bytes(16), bytes(range(16)), bytes(range(32))):
+        expected = [CMAC.new(key, message, ciphermod=AES).digest() for message in messages]
+        assert [tesla_chain._cmac_aes(key, message) for message in messages] == expected
+        assert tesla_chain.compute_macs(key, messages) == expected
+
+
+@pytest.fixture(scope='module')
+def configuration_1_halves(configuration_1_pages) -> tuple[list, list]:
+    middle = len(configuration_1_pages) // 2
+    return configuration_1_pages[:middle], configuration_1_pages[middle:]
+
+
+@pytest.fixture
+def stored_tesla_key(configuration_1_exec_path, configuration_1_halves, caplog) -> Path:
+    run_receiver(configuration_1_exec_path, configuration_1_halves[0], caplog, do_tesla_key_store=True)
+    return configuration_1_exec_path
+
+
+def _read_key_file(exec_path: Path) -> list[str]:
+    return (exec_path / TESLA_KEY_FILE).read_text().split('\n')
+
+
+def test_tesla_key_not_stored_by_default(configuration_1_exec_path, configuration_1_halves, caplog):
+    run_receiver(configuration_1_exec_path, configuration_1_halves[0][:20000], caplog)
+
+    assert (configuration_1_exec_path / KROOT_FILE).exists()
+    assert not (configuration_1_exec_path / TESLA_KEY_FILE).exists()
+
+
+def test_tesla_key_store_load_and_resume(stored_tesla_key, configuration_1_halves, caplog):
+    kroot, info, key = _read_key_file(stored_tesla_key)
+    chain_id, index, wn, tow = [int(value) for value in info.split()]
+    assert index > 0 and len(bytes.fromhex(key)) * 8 == 128
+
+    log_text = run_receiver(stored_tesla_key, configuration_1_halves[1], caplog, kroot_name=KROOT_FILE, do_tesla_key_store=True)
+
+    assert f"TESLA key {index} read from previous execution." in log_text
+    assert f"Tesla key {index} resumed from the stored key at {wn} {tow}." in log_text
+    assert 'Discarded' not in log_text and 'ERROR' not in log_text
+    assert len(re.findall('Tag AUTHENTICATED', log_text)) > 0
+
+
+def test_tesla_key_resume_rejected(stored_tesla_key, configuration_1_halves, caplog):
+    kroot, info, key = _read_key_file(stored_tesla_key)
+    index = int(info.split()[1])
+    wrong_key = bytes(byte ^ 0xFF for byte in bytes.fromhex(key)).hex()
+    (stored_tesla_key / TESLA_KEY_FILE).write_text(f"{kroot}\n{info}\n{wrong_key}")
+
+    log_text = run_receiver(stored_tesla_key, configuration_1_halves[1], caplog, kroot_name=KROOT_FILE, do_tesla_key_store=True)
+    (stored_tesla_key / TESLA_KEY_FILE).write_text(f"{kroot}\n{info}\n{key}")
+    log_resumed = run_receiver(stored_tesla_key, configuration_1_halves[1], caplog, kroot_name=KROOT_FILE, do_tesla_key_store=True)
+
+    assert f"Stored TESLA key {index} at" in log_text and 'Discarded, verifying from the KROOT.' in log_text
+    assert 'resumed from the stored key' not in log_text and 'ERROR' not in log_text
+    # The keys are verified from the KROOT and authenticate the same tags
+    assert (len(re.findall('Tag AUTHENTICATED', log_text)) == len(re.findall('Tag AUTHENTICATED', log_resumed))
+            > 0)
+
+
+def test_tesla_key_inconsistent_index_not_used(stored_tesla_key, configuration_1_halves, caplog):
+    kroot, info, key = _read_key_file(stored_tesla_key)
+    chain_id, index, wn, tow = [int(value) for value in info.split()]
+    (stored_tesla_key / TESLA_KEY_FILE).write_text(f"{kroot}\n{chain_id} {index + 1} {wn} {tow}\n{key}")
+
+    log_text = run_receiver(stored_tesla_key, configuration_1_halves[1][:20000], caplog, kroot_name=KROOT_FILE, do_tesla_key_store=True)
+
+    assert f"Stored TESLA key index {index + 1} is not consistent with its GST" in log_text
+    assert 'read from previous execution' not in log_text and 'resumed from the stored key' not in log_text
+
+
+def test_tesla_chain_catch_up_with_time_budget(configuration_1_exec_path, configuration_1_halves, caplog):
+    # Reception gap of 10 minutes, the first key after it is 20 hashes away from the last verified key
+    first_tow = configuration_1_halves[0][0].gst_page.tow
+    pages = [page for page in configuration_1_halves[0] if not 300 <= page.gst_page.tow - first_tow < 900]
+
+    log_sync = run_receiver(configuration_1_exec_path, pages, caplog)
+    log_budget = run_receiver(configuration_1_exec_path, pages, caplog, tesla_catch_up_budget=1e-9)
+
+    # The verification of the keys is deferred to the next pages instead of done when the key is received
+    assert 'catch-up started' not in log_sync
+    assert len(re.findall('catch-up started from key', log_budget)) > 0
+    assert 'Failed authentication' not in log_budget and 'ERROR' not in log_budget
+
+    # Once the catch-up ends the same keys and tags are authenticated
+    tesla_keys = re.findall(r'Tesla key (\d+) Authenticated', log_sync)
+    assert re.findall(r'Tesla key (\d+) Authenticated', log_budget) == tesla_keys
+    assert len(re.findall('Tag AUTHENTICATED', log_budget)) == len(re.findall('Tag AUTHENTICATED', log_sync)) > 0